@@ -1,6 +1,8 @@
 #!/bin/bash
 # One-time cleanup script to remove duplicate local_id records
 # Keeps the most recent record (by date_requested) for each voter
+# Usage: ./cleanup_duplicates.sh [election]
+#   election defaults to ELECTION from .env (e.g. 2025_general)
 
 # Load environment variables from .env file
 if [ -f .env ]; then
@@ -15,18 +17,26 @@ DB_USER="${DB_USER}"
 DB_PASS="${DB_PASS}"
 DB_NAME="${DB_NAME}"
 TABLE_NAME="${TABLE_NAME}"
+ELECTION="${1:-$ELECTION}"
 
-echo "Cleaning up duplicate records..."
+if [[ ! "$ELECTION" =~ ^[A-Za-z0-9_]+$ ]]; then
+    echo "Error: Invalid or missing election '$ELECTION'"
+    echo "Pass it as the first argument or set ELECTION in .env"
+    exit 1
+fi
+
+echo "Cleaning up duplicate records for election $ELECTION..."
 echo "This will keep only the most recent ballot request per voter"
 echo ""
 
 # Show current duplicates
 echo "Current duplicates:"
-mysql -u "$DB_USER" -p"$DB_PASS" "$DB_NAME" << 'EOF'
+mysql -u "$DB_USER" -p"$DB_PASS" "$DB_NAME" << EOF
 SELECT local_id, COUNT(*) as count, 
        GROUP_CONCAT(CONCAT(first_name, ' ', last_name) SEPARATOR '; ') as voters,
        GROUP_CONCAT(date_requested ORDER BY date_requested) as request_dates
-FROM fcabs1004 
+FROM $TABLE_NAME 
+WHERE election = '$ELECTION'
 GROUP BY local_id 
 HAVING COUNT(*) > 1;
 EOF
@@ -40,19 +50,21 @@ if [ "$confirm" != "yes" ]; then
 fi
 
 # Remove duplicates, keeping the latest request
-mysql -u "$DB_USER" -p"$DB_PASS" "$DB_NAME" << 'EOF'
+mysql -u "$DB_USER" -p"$DB_PASS" "$DB_NAME" << EOF
 -- Delete older duplicate records, keeping the one with the latest date_requested
-DELETE f1 FROM fcabs1004 f1
-INNER JOIN fcabs1004 f2 
-WHERE f1.local_id = f2.local_id
+-- (both sides restricted to one election so only its partition is touched)
+DELETE f1 FROM $TABLE_NAME f1
+INNER JOIN $TABLE_NAME f2 
+WHERE f1.election = '$ELECTION' AND f2.election = '$ELECTION'
+  AND f1.local_id = f2.local_id
   AND (
     f1.date_requested < f2.date_requested 
     OR (f1.date_requested = f2.date_requested AND f1.id < f2.id)
   );
 
 -- Show results
-SELECT 'Records after cleanup' as status, COUNT(*) as count FROM fcabs1004;
-SELECT 'Unique voters' as status, COUNT(DISTINCT local_id) as count FROM fcabs1004;
+SELECT 'Records after cleanup' as status, COUNT(*) as count FROM $TABLE_NAME WHERE election = '$ELECTION';
+SELECT 'Unique voters' as status, COUNT(DISTINCT local_id) as count FROM $TABLE_NAME WHERE election = '$ELECTION';
 EOF
 
 echo ""
@@ -120,7 +120,7 @@ http://$(hostname -I | awk '{print $1}')/ionic/fcabs/
 To redeploy:
 $SOURCE_DIR/deploy_viewer.sh
 
-Database: ohsosvoterfiles.fcabs1004
+Database: $DB_NAME.$TABLE_NAME (election $ELECTION)
 EOF
 
 # Set proper ownership (assuming www-data for Apache)
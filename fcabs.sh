@@ -1,30 +1,98 @@
 #!/usr/bin/env bash
+# Fetch the county absentee ballot export and load it into the database.
+# Usage: ./fcabs.sh [-y] [election]
+#   -y        load without prompting (for cron / frequent polling)
+#   election  passed through to update_and_refresh.sh (default: ELECTION from .env)
+#
+# Polling is cheap: the download is conditional (ETag / Last-Modified), and
+# parsing + loading are skipped entirely when the export's SHA-256 matches
+# the last successful load. Set FCABS_URL to point at a local stand-in server
+# for testing.
 set -euo pipefail
-BASE='https://electionlink.franklincountyohio.gov/portals/ElectionVault/PublicRecords.aspx'
+BASE="${FCABS_URL:-https://electionlink.franklincountyohio.gov/portals/ElectionVault/PublicRecords.aspx}"
 EVENTTARGET='ctl00$ElectionVaultMaster$gvRecord$cell0_0$TC$btnDownload'
+SOURCE_DIR="${SOURCE_DIR:-/home/jmknapp/indivisible}"
+STATE_DIR="${FCABS_STATE_DIR:-$HOME/.cache/fcabs}"
 OUT='/tmp/fcabs.csv'  # save as CSV, overwriting if it exists
 
+RAW="$STATE_DIR/export.raw"              # last complete download, as served
+PART="$STATE_DIR/export.part"            # in-progress download
+ETAG="$STATE_DIR/export.etag"            # ETag of RAW, sent as If-None-Match
+HASH_FILE="$STATE_DIR/last_loaded.sha256" # hash of the last export loaded successfully
+COOKIES="$STATE_DIR/cookies.txt"
+PAGE="$STATE_DIR/page.html"
+
+LOAD_ARGS=()
+if [ "${1:-}" = "-y" ]; then
+    LOAD_ARGS+=(-y)
+    shift
+fi
+ELECTION="${1:-}"
+
+mkdir -p "$STATE_DIR"
+
+# Retry transient failures; curl backs off exponentially (1s, 2s, 4s, ...) between attempts
+CURL=(curl -sS --fail --retry 5 --retry-connrefused --retry-max-time 300)
+
 # 1) Get the page to grab cookies + hidden fields
-curl -sS "$BASE" -c cookies.txt -o page.html
+"${CURL[@]}" "$BASE" -c "$COOKIES" -o "$PAGE"
 
 # 2) Extract hidden fields
-VIEWSTATE=$(grep -oP 'id="__VIEWSTATE"[^>]*value="\K[^"]+' page.html | head -1)
-VIEWSTATEGEN=$(grep -oP 'id="__VIEWSTATEGENERATOR"[^>]*value="\K[^"]+' page.html | head -1)
-EVENTVALID=$(grep -oP 'id="__EVENTVALIDATION"[^>]*value="\K[^"]+' page.html | head -1)
-REQVERTOKEN=$(grep -oP 'name="__RequestVerificationToken"[^>]*value="\K[^"]+' page.html | head -1)
-
-# 3) Post back to trigger the file download (curl will overwrite OUT if it exists)
-curl -sS "$BASE" \
-  -b cookies.txt -c cookies.txt \
+VIEWSTATE=$(grep -oP 'id="__VIEWSTATE"[^>]*value="\K[^"]+' "$PAGE" | head -1)
+VIEWSTATEGEN=$(grep -oP 'id="__VIEWSTATEGENERATOR"[^>]*value="\K[^"]+' "$PAGE" | head -1)
+EVENTVALID=$(grep -oP 'id="__EVENTVALIDATION"[^>]*value="\K[^"]+' "$PAGE" | head -1)
+REQVERTOKEN=$(grep -oP 'name="__RequestVerificationToken"[^>]*value="\K[^"]+' "$PAGE" | head -1)
+
+# 3) Post back to trigger the file download. The export only comes from a
+#    POST, so it can't be resumed with a byte range (curl would offset the
+#    request body); download to a part file and keep RAW intact on failure.
+CONDITIONAL=()
+# Only ask "has it changed?" if we still have the copy the validators describe.
+# Send plain request headers and let the server decide: curl's -z also compares
+# dates itself and discards a 200 whose Last-Modified isn't newer (reporting
+# 304), even when the ETag says the export changed.
+if [ -f "$RAW" ]; then
+    if [ -s "$ETAG" ]; then
+        CONDITIONAL=(--etag-compare "$ETAG")
+    else
+        CONDITIONAL=(-H "If-Modified-Since: $(date -u -r "$RAW" '+%a, %d %b %Y %H:%M:%S GMT')")
+    fi
+fi
+
+HTTP_CODE=$("${CURL[@]}" "$BASE" \
+  -b "$COOKIES" -c "$COOKIES" \
+  "${CONDITIONAL[@]}" \
+  --etag-save "$ETAG.new" -R \
   --data-urlencode "__EVENTTARGET=$EVENTTARGET" \
   --data-urlencode "__EVENTARGUMENT=" \
   --data-urlencode "__VIEWSTATE=$VIEWSTATE" \
   --data-urlencode "__VIEWSTATEGENERATOR=$VIEWSTATEGEN" \
   --data-urlencode "__EVENTVALIDATION=$EVENTVALID" \
   --data-urlencode "__RequestVerificationToken=$REQVERTOKEN" \
-  -o "$OUT"
+  -w '%{http_code}' \
+  -o "$PART") || { rm -f "$PART" "$ETAG.new"; echo "Download failed"; exit 1; }
+
+if [ "$HTTP_CODE" = "304" ]; then
+    echo "Export not modified on server"
+    rm -f "$PART" "$ETAG.new"
+else
+    mv "$PART" "$RAW"
+    if [ -s "$ETAG.new" ]; then
+        mv "$ETAG.new" "$ETAG"
+    else
+        rm -f "$ETAG" "$ETAG.new"
+    fi
+    echo "Downloaded: $RAW"
+fi
+
+# 4) Skip parsing and loading when this exact export was already loaded
+NEW_HASH=$(sha256sum "$RAW" | cut -d' ' -f1)
+if [ -f "$HASH_FILE" ] && [ "$(cat "$HASH_FILE")" = "$NEW_HASH" ]; then
+    echo "Export unchanged since last load ($NEW_HASH), nothing to do"
+    exit 0
+fi
 
-echo "Downloaded: $OUT"
+cp "$RAW" "$OUT"
 
 # Preprocess the CSV
 echo "Preprocessing CSV..."
@@ -43,5 +111,7 @@ tail -n +2 "$OUT" >> "$TEMP_FILE"
 mv "$TEMP_FILE" "$OUT"
 echo "Saved: $OUT"
 
-# Update database with the new file
-/home/jmknapp/indivisible/update_and_refresh.sh "$OUT"
+# Update database with the new file, and remember it only once the load succeeded
+cd "$SOURCE_DIR"
+./update_and_refresh.sh "${LOAD_ARGS[@]}" "$OUT" $ELECTION
+echo "$NEW_HASH" > "$HASH_FILE"
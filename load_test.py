@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+Election-night load test for the Voter Viewer
+
+Replays a mix of index() traffic against a running viewer while ramping
+concurrency, and reports throughput, p50/p95/p99 latency and error rate per
+request type at each step:
+
+  initial   - full page load (GET /)
+  sort      - ajax=1 sort click, across all eight sort columns
+  filter    - party/status (and occasionally change set) filter change
+  show_all  - full page with limit=all
+
+Only the standard library is used. Point it at a local viewer backed by a
+local MySQL/MariaDB seeded with synthetic data, never at production:
+
+  ./manage_elections.sh init loadtest                  # once, on a scratch database
+  ./load_test.py seed --rows 20000 --load              # synthetic export, loaded with update_and_refresh.sh
+  ELECTION=loadtest python3 voter_viewer.py &
+  ./load_test.py run --concurrency 1,5,10,25,50 --step-seconds 20
+
+To see how the viewer holds up while a daily load is running, start the
+load when the ramp starts (requests are tagged idle/load in the report):
+
+  ./load_test.py seed --rows 20000 --seed 2 --out /tmp/fcabs_next.csv
+  ./load_test.py run --during-load "./update_and_refresh.sh -y /tmp/fcabs_next.csv loadtest"
+"""
+
+import argparse
+import csv
+import json
+import math
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import date, timedelta
+
+SORT_COLUMNS = ['name', 'party', 'address', 'city', 'precinct', 'requested', 'returned', 'status']
+REQUEST_TYPES = ['initial', 'sort', 'filter', 'show_all']
+DEFAULT_MIX = 'initial=30,sort=45,filter=22,show_all=3'
+
+# Values the synthetic data uses; the filter traffic picks from the same sets
+PARTIES = ['D', 'R', 'L', 'G', '']
+STATUSES = ['VAL'] * 70 + [''] * 20 + ['IDNOMATCH', 'NOSIG', 'NOID', 'REFUSED', 'LATE'] * 2
+CHANGE_TYPES = ['new_rejection', 'new_return', 'new_request', 'cured', 'still_outstanding']
+
+# Column order of the county export, after fcabs.sh preprocessing (see fcabs.txt)
+CSV_COLUMNS = [
+    'PRECINCT_NAME', 'PRECINCT_CODE', 'PRECINCT_CODE_WITH_SPLIT', 'CITY_OR_VILLAGE',
+    'SCHOOL_DISTRICT', 'TOWNSHIP', 'HOUSE_DISTRICT', 'SENATE_DISTRICT', 'CONGRESS_DISTRICT',
+    'POLICE_DISTRICT', 'ROAD_DISTRICT', 'FIRE_DISTRICT', 'PARK_DISTRICT', 'COURT_APPEALS_NAME',
+    'BOARD_OF_ED_NAME', 'PARTY', 'DATE_MAILED', 'DATE_REGISTERED', 'LOCAL_ID', 'YEAR_OF_BIRTH',
+    'FIRST_NAME', 'MIDDLE_NAME', 'LAST_NAME', 'SUFFIX_NAME', 'ADDRESS_LINE_1', 'ADDRESS_LINE_2',
+    'ADDRESS_LINE_3', 'ADDRESS_LINE_4', 'CITY', 'STATE', 'ZIP', 'ZIP_PLUS_4', 'MAILED',
+    'DATE_REQUESTED', 'DATE_RETURNED', 'BALLOT_STYLE', 'status',
+]
+
+FIRST_NAMES = ['James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda',
+               'David', 'Elizabeth', 'William', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica',
+               'Thomas', 'Sarah', 'Charles', 'Karen', 'Aisha', 'Mohamed', 'Wei', 'Priya']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis',
+              'Rodriguez', 'Martinez', 'Hernandez', 'Lopez', 'Wilson', 'Anderson', 'Thomas',
+              'Taylor', 'Moore', 'Jackson', 'Martin', 'Lee', 'Nguyen', 'Patel', 'Ali', 'Kim']
+STREETS = ['High St', 'Broad St', 'Main St', 'Livingston Ave', 'Parsons Ave', 'Cleveland Ave',
+           'Morse Rd', 'Hudson St', 'Summit St', 'Indianola Ave', 'Sawmill Rd', 'Hamilton Rd']
+CITIES = [('COLUMBUS', '43215'), ('COLUMBUS', '43201'), ('COLUMBUS', '43206'),
+          ('WORTHINGTON', '43085'), ('WESTERVILLE', '43081'), ('DUBLIN', '43017'),
+          ('GROVE CITY', '43123'), ('REYNOLDSBURG', '43068'), ('BEXLEY', '43209')]
+
+
+# ---------------------------------------------------------------------------
+# Synthetic data
+# ---------------------------------------------------------------------------
+
+def synthetic_rows(count, rng, election_day):
+    """Yield synthetic export rows (as lists in CSV_COLUMNS order)"""
+    fmt = '%m/%d/%Y'
+    for i in range(count):
+        city, zip_code = rng.choice(CITIES)
+        precinct = rng.randint(1, 400)
+        requested = election_day - timedelta(days=rng.randint(10, 60))
+        status = rng.choice(STATUSES)
+        returned = requested + timedelta(days=rng.randint(3, 9)) if status else None
+        party = rng.choice(PARTIES)
+        yield [
+            f'{city} {precinct:03d}-A', f'{precinct:03d}', f'{precinct:03d}A', city,
+            f'{city} CITY SD', '', f'HOUSE {rng.randint(1, 12)}', f'SENATE {rng.randint(1, 4)}',
+            f'CONGRESS {rng.choice([3, 15])}', '', '', '', '', '10TH DISTRICT', f'{city} BOE',
+            party, requested.strftime(fmt),
+            (requested - timedelta(days=rng.randint(100, 9000))).strftime(fmt),
+            f'LT{i:08d}', str(rng.randint(1935, 2006)),
+            rng.choice(FIRST_NAMES), rng.choice(FIRST_NAMES + [''] * 8), rng.choice(LAST_NAMES), '',
+            f'{rng.randint(100, 9999)} {rng.choice(STREETS)}', '', '', '', city, 'OH', zip_code,
+            f'{rng.randint(0, 9999):04d}', 'Y',
+            requested.strftime(fmt), returned.strftime(fmt) if returned else '',
+            f'BS{rng.randint(1, 80)}', status,
+        ]
+
+
+def seed(args):
+    """Write a synthetic export and optionally load it with update_and_refresh.sh"""
+    rng = random.Random(args.seed)
+    with open(args.out, 'w', newline='') as f:
+        writer = csv.writer(f, delimiter='\t', lineterminator='\n')
+        writer.writerow(CSV_COLUMNS)
+        writer.writerows(synthetic_rows(args.rows, rng, date.today() + timedelta(days=7)))
+    print(f"Wrote {args.rows:,} synthetic records to {args.out}")
+
+    if args.load:
+        command = ['./update_and_refresh.sh', '-y', args.out, args.election]
+        print(f"Loading: {' '.join(command)}")
+        return subprocess.call(command)
+    return 0
+
+
+# ---------------------------------------------------------------------------
+# Traffic
+# ---------------------------------------------------------------------------
+
+def parse_mix(spec):
+    """Parse 'initial=30,sort=45,...' into (types, weights)"""
+    weights = {}
+    for part in spec.split(','):
+        name, _, weight = part.partition('=')
+        if name not in REQUEST_TYPES:
+            raise argparse.ArgumentTypeError(f"unknown request type '{name}'")
+        weights[name] = float(weight)
+    return list(weights), list(weights.values())
+
+
+def random_filters(rng, election):
+    """A filter state a user might be looking at"""
+    params = {}
+    if election:
+        params['election'] = election
+    roll = rng.random()
+    if roll < 0.35:
+        params['party'] = rng.choice([p for p in PARTIES if p])
+    elif roll < 0.7:
+        params['status'] = rng.choice(['VAL', 'Outstanding', 'IDNOMATCH', 'NOSIG'])
+    elif roll < 0.8:
+        params['change'] = rng.choice(CHANGE_TYPES)
+    return params
+
+
+def build_request(request_type, rng, election):
+    """Return the query parameters for one request of the given type"""
+    if request_type == 'initial':
+        return {'election': election} if election else {}
+    if request_type == 'filter':
+        params = random_filters(rng, election)
+        if len(params) <= (1 if election else 0):
+            params['party'] = rng.choice([p for p in PARTIES if p])
+        return params
+    if request_type == 'sort':
+        params = random_filters(rng, election)
+        params['sort'] = rng.choice(SORT_COLUMNS)
+        params['dir'] = rng.choice(['asc', 'desc'])
+        params['ajax'] = '1'
+        return params
+    params = random_filters(rng, election)
+    params['limit'] = 'all'
+    return params
+
+
+class Results:
+    """Thread-safe collection of (type, phase, latency, ok) samples"""
+
+    def __init__(self):
+        self.samples = []
+        self.lock = threading.Lock()
+
+    def add(self, sample):
+        with self.lock:
+            self.samples.append(sample)
+
+
+def send(base_url, request_type, params, timeout):
+    """Issue one request; return (latency seconds, ok, error)"""
+    url = base_url + ('?' + urllib.parse.urlencode(params) if params else '')
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            body = response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        return time.perf_counter() - start, False, f'HTTP {e.code}'
+    except Exception as e:
+        return time.perf_counter() - start, False, type(e).__name__
+    latency = time.perf_counter() - start
+
+    if status != 200:
+        return latency, False, f'HTTP {status}'
+    if request_type == 'sort':
+        try:
+            json.loads(body)['html']
+        except (ValueError, KeyError, TypeError):
+            return latency, False, 'bad JSON'
+    return latency, True, None
+
+
+def worker(args, types, weights, results, errors, stop, loader, seed):
+    rng = random.Random(seed)
+    while not stop.is_set():
+        request_type = rng.choices(types, weights)[0]
+        params = build_request(request_type, rng, args.election)
+        phase = 'load' if loader.running() else 'idle'
+        latency, ok, error = send(args.url, request_type, params, args.timeout)
+        results.add((request_type, phase, latency, ok))
+        if error:
+            with results.lock:
+                errors[error] = errors.get(error, 0) + 1
+        if args.think_time:
+            stop.wait(rng.uniform(0, 2 * args.think_time))
+
+
+class Loader:
+    """Optional background command (e.g. a daily load) started with the ramp"""
+
+    def __init__(self, command):
+        self.command = command
+        self.process = None
+        self.started = self.finished = None
+
+    def start(self):
+        if self.command:
+            print(f"Starting load: {self.command}")
+            self.started = time.monotonic()
+            self.process = subprocess.Popen(
+                self.command, shell=True, stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT
+            )
+
+    def running(self):
+        if self.process is None or self.finished is not None:
+            return False
+        if self.process.poll() is None:
+            return True
+        self.finished = time.monotonic()
+        return False
+
+
+# ---------------------------------------------------------------------------
+# Reporting
+# ---------------------------------------------------------------------------
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(samples, duration):
+    """Per request type: count, req/s (if duration is given), error rate, p50/p95/p99 (ms)"""
+    rows = []
+    for request_type in REQUEST_TYPES + ['total']:
+        selected = [s for s in samples if request_type == 'total' or s[0] == request_type]
+        if not selected:
+            continue
+        latencies = sorted(s[2] * 1000 for s in selected)
+        failures = sum(1 for s in selected if not s[3])
+        rows.append({
+            'type': request_type,
+            'requests': len(selected),
+            'rps': len(selected) / duration if duration else None,
+            'error_rate': failures / len(selected),
+            'p50_ms': percentile(latencies, 50),
+            'p95_ms': percentile(latencies, 95),
+            'p99_ms': percentile(latencies, 99),
+        })
+    return rows
+
+
+def print_table(rows):
+    print(f"  {'type':<10}{'requests':>10}{'req/s':>9}{'errors':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for row in rows:
+        rps = f"{row['rps']:.1f}" if row['rps'] is not None else '-'
+        print(f"  {row['type']:<10}{row['requests']:>10}{rps:>9}{row['error_rate']:>8.1%}"
+              f"{row['p50_ms']:>10.0f}{row['p95_ms']:>10.0f}{row['p99_ms']:>10.0f}")
+
+
+def run(args):
+    """Ramp concurrency through the steps and report each one"""
+    types, weights = args.mix
+    loader = Loader(args.during_load)
+    report = {'url': args.url, 'steps': []}
+    all_samples = []
+
+    loader.start()
+    for step, concurrency in enumerate(args.concurrency):
+        results = Results()
+        errors = {}
+        stop = threading.Event()
+        threads = [
+            threading.Thread(target=worker, daemon=True,
+                             args=(args, types, weights, results, errors, stop, loader,
+                                   args.seed * 100003 + step * 1009 + i))
+            for i in range(concurrency)
+        ]
+        start = time.monotonic()
+        for thread in threads:
+            thread.start()
+        stop.wait(args.step_seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        duration = time.monotonic() - start
+
+        samples = results.samples
+        all_samples.extend(samples)
+        during = sum(1 for s in samples if s[1] == 'load')
+        note = f", {during / len(samples):.0%} during load" if samples and during else ''
+        print(f"\nConcurrency {concurrency} ({duration:.0f}s{note})")
+        rows = summarize(samples, duration)
+        print_table(rows)
+        if errors:
+            print("  errors: " + ', '.join(f'{k} x{v}' for k, v in sorted(errors.items())))
+        report['steps'].append({'concurrency': concurrency, 'seconds': duration,
+                                'results': rows, 'errors': errors})
+
+    if loader.process is not None:
+        # Keep the split meaningful even if the load outlives the ramp
+        if loader.running():
+            print("\nLoad still running after the ramp; waiting for it to finish...")
+            loader.process.wait()
+            loader.running()
+        print(f"\nLoad exited with status {loader.process.returncode} "
+              f"after {loader.finished - loader.started:.0f}s")
+        for phase in ('idle', 'load'):
+            samples = [s for s in all_samples if s[1] == phase]
+            if samples:
+                print(f"\nAll steps, {phase}:")
+                print_table(summarize(samples, None))
+        report['load_exit_status'] = loader.process.returncode
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.json}")
+
+    failures = sum(1 for s in all_samples if not s[3])
+    return 1 if all_samples and failures / len(all_samples) > args.max_error_rate else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    seed_parser = subparsers.add_parser('seed', help='write (and optionally load) a synthetic export')
+    seed_parser.add_argument('--rows', type=int, default=20000, help='number of records (default 20000)')
+    seed_parser.add_argument('--out', default='/tmp/fcabs_synthetic.csv', help='output file')
+    seed_parser.add_argument('--seed', type=int, default=1, help='random seed (vary it for a "next day" export)')
+    seed_parser.add_argument('--election', default='loadtest', help='election to load into (default loadtest)')
+    seed_parser.add_argument('--load', action='store_true', help='load it with ./update_and_refresh.sh -y')
+
+    run_parser = subparsers.add_parser('run', help='replay viewer traffic while ramping concurrency')
+    run_parser.add_argument('--url', default='http://localhost:5000/', help='viewer URL (default http://localhost:5000/)')
+    run_parser.add_argument('--election', default='', help='election parameter to send (default: viewer default)')
+    run_parser.add_argument('--concurrency', default='1,5,10,25,50',
+                            type=lambda s: [int(n) for n in s.split(',')],
+                            help='comma-separated concurrent users per step (default 1,5,10,25,50)')
+    run_parser.add_argument('--step-seconds', type=float, default=20, help='duration of each step (default 20)')
+    run_parser.add_argument('--think-time', type=float, default=0,
+                            help='mean pause between a user\'s requests in seconds (default 0)')
+    run_parser.add_argument('--mix', default=DEFAULT_MIX, type=parse_mix,
+                            help=f'request type weights (default {DEFAULT_MIX})')
+    run_parser.add_argument('--timeout', type=float, default=30, help='per-request timeout (default 30)')
+    run_parser.add_argument('--during-load', metavar='CMD',
+                            help='shell command (e.g. a daily load) to run in the background during the ramp')
+    run_parser.add_argument('--seed', type=int, default=1, help='random seed for the traffic mix')
+    run_parser.add_argument('--json', help='also write the report to this file')
+    run_parser.add_argument('--max-error-rate', type=float, default=0.01,
+                            help='exit 1 if the overall error rate exceeds this (default 0.01)')
+
+    args = parser.parse_args()
+    if args.command == 'seed':
+        return seed(args)
+    return run(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,246 @@
+#!/bin/bash
+# Manage per-election partitions of the absentee ballot tables
+#
+# All elections live in one table ($TABLE_NAME), LIST-partitioned on the
+# `election` column with one partition (p_<election>) per election. The
+# per-load change sets (${TABLE_NAME}_changes, see record_changes.sh) are
+# partitioned the same way. Queries that filter on election are pruned to a
+# single partition, and an old election can be archived or dropped as a whole
+# partition instead of with table-wide DELETEs.
+#
+# Usage: ./manage_elections.sh init <election>              create the partitioned table
+#        ./manage_elections.sh add <election>               add a partition (no-op if present)
+#        ./manage_elections.sh list                         show elections and row counts
+#        ./manage_elections.sh import <election> <table>    copy a legacy per-election table in
+#        ./manage_elections.sh archive <election>           move a partition to ${TABLE_NAME}_<election>
+#                                                           (its change sets are dropped)
+#        ./manage_elections.sh drop <election>              drop a partition and its data
+#
+# Election names may only contain letters, digits and underscores (e.g. 2025_general).
+
+set -e  # Exit on any error
+
+# Load environment variables from .env file
+if [ -f .env ]; then
+    export $(grep -v '^#' .env | xargs)
+else
+    echo "Error: .env file not found"
+    echo "Please copy .env.example to .env and configure your database credentials."
+    exit 1
+fi
+
+DB_USER="${DB_USER}"
+DB_PASS="${DB_PASS}"
+DB_NAME="${DB_NAME}"
+TABLE_NAME="${TABLE_NAME}"
+CHANGES_TABLE="${TABLE_NAME}_changes"
+
+COMMAND="$1"
+ELECTION="$2"
+
+usage() {
+    echo "Usage: $0 init|add|archive|drop <election>"
+    echo "       $0 import <election> <legacy_table>"
+    echo "       $0 list"
+    exit 1
+}
+
+require_election() {
+    if [ -z "$ELECTION" ]; then
+        usage
+    fi
+    if [[ ! "$ELECTION" =~ ^[A-Za-z0-9_]+$ ]]; then
+        echo "Error: invalid election name '$ELECTION' (letters, digits and underscores only)"
+        exit 1
+    fi
+    PARTITION="p_$ELECTION"
+}
+
+partition_exists() {
+    local count
+    count=$(mysql -u "$DB_USER" -p"$DB_PASS" "$DB_NAME" -sN -e "
+        SELECT COUNT(*) FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = '$1'
+          AND PARTITION_NAME = '$PARTITION';")
+    [ "$count" != "0" ]
+}
+
+# MySQL can't drop a table's only partition, so refuse before touching anything
+require_other_partitions() {
+    local count
+    count=$(mysql -u "$DB_USER" -p"$DB_PASS" "$DB_NAME" -sN -e "
+        SELECT COUNT(*) FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = '$TABLE_NAME';")
+    if [ "$count" -le 1 ]; then
+        echo "Error: $PARTITION is the only partition of $TABLE_NAME, and MySQL can't drop it"
+        echo "Add the next election first ($0 add <election>), or remove the whole table with"
+        echo "DROP TABLE $TABLE_NAME, $CHANGES_TABLE"
+        exit 1
+    fi
+}
+
+case "$COMMAND" in
+    init)
+        require_election
+        mysql -u "$DB_USER" -p"$DB_PASS" "$DB_NAME" << EOF
+CREATE TABLE $TABLE_NAME (
+    id INT NOT NULL AUTO_INCREMENT,
+    election VARCHAR(32) NOT NULL,
+    precinct_name VARCHAR(100),
+    precinct_code VARCHAR(20),
+    precinct_code_with_split VARCHAR(20),
+    city_or_village VARCHAR(100),
+    school_district VARCHAR(100),
+    township VARCHAR(100),
+    house_district VARCHAR(50),
+    senate_district VARCHAR(50),
+    congress_district VARCHAR(50),
+    police_district VARCHAR(100),
+    road_district VARCHAR(100),
+    fire_district VARCHAR(100),
+    park_district VARCHAR(100),
+    court_appeals_name VARCHAR(100),
+    board_of_ed_name VARCHAR(100),
+    party VARCHAR(5),
+    date_mailed DATE,
+    date_registered DATE,
+    local_id VARCHAR(32),
+    year_of_birth SMALLINT,
+    first_name VARCHAR(50),
+    middle_name VARCHAR(50),
+    last_name VARCHAR(50),
+    suffix_name VARCHAR(10),
+    address_line_1 VARCHAR(100),
+    address_line_2 VARCHAR(100),
+    address_line_3 VARCHAR(100),
+    address_line_4 VARCHAR(100),
+    city VARCHAR(50),
+    state VARCHAR(2),
+    zip VARCHAR(10),
+    zip_plus_4 VARCHAR(10),
+    mailed VARCHAR(10),
+    date_requested DATE,
+    date_returned DATE,
+    ballot_style VARCHAR(20),
+    status VARCHAR(32),
+    PRIMARY KEY (id, election),
+    INDEX idx_local_id (local_id),
+    INDEX idx_status (status),
+    INDEX idx_party (party),
+    INDEX idx_name (last_name, first_name)
+)
+PARTITION BY LIST COLUMNS (election) (
+    PARTITION $PARTITION VALUES IN ('$ELECTION')
+);
+
+CREATE TABLE $CHANGES_TABLE (
+    id INT NOT NULL AUTO_INCREMENT,
+    election VARCHAR(32) NOT NULL,
+    load_time DATETIME NOT NULL,
+    change_type ENUM('new_request', 'new_return', 'new_rejection', 'cured', 'still_outstanding') NOT NULL,
+    local_id VARCHAR(32) NOT NULL,
+    date_requested DATE NULL,
+    old_status VARCHAR(32) NULL,
+    new_status VARCHAR(32) NULL,
+    PRIMARY KEY (id, election),
+    INDEX idx_load_change (load_time, change_type),
+    INDEX idx_local_id (local_id)
+)
+PARTITION BY LIST COLUMNS (election) (
+    PARTITION $PARTITION VALUES IN ('$ELECTION')
+);
+EOF
+        echo "✓ Created $TABLE_NAME and $CHANGES_TABLE with partition $PARTITION"
+        ;;
+
+    add)
+        require_election
+        for TABLE in "$TABLE_NAME" "$CHANGES_TABLE"; do
+            if partition_exists "$TABLE"; then
+                echo "✓ Partition $PARTITION already exists in $TABLE"
+            else
+                mysql -u "$DB_USER" -p"$DB_PASS" "$DB_NAME" -e "
+                    ALTER TABLE $TABLE ADD PARTITION (PARTITION $PARTITION VALUES IN ('$ELECTION'));"
+                echo "✓ Added partition $PARTITION to $TABLE"
+            fi
+        done
+        ;;
+
+    list)
+        mysql -u "$DB_USER" -p"$DB_PASS" "$DB_NAME" << EOF
+SELECT SUBSTRING(PARTITION_NAME, 3) as election, TABLE_ROWS as approx_rows
+FROM information_schema.PARTITIONS
+WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = '$TABLE_NAME'
+ORDER BY PARTITION_ORDINAL_POSITION;
+EOF
+        ;;
+
+    import)
+        require_election
+        LEGACY_TABLE="$3"
+        if [ -z "$LEGACY_TABLE" ]; then
+            usage
+        fi
+        "$0" add "$ELECTION"
+        mysql -u "$DB_USER" -p"$DB_PASS" "$DB_NAME" << EOF
+INSERT INTO $TABLE_NAME (
+    election, precinct_name, precinct_code, precinct_code_with_split, city_or_village,
+    school_district, township, house_district, senate_district, congress_district,
+    police_district, road_district, fire_district, park_district,
+    court_appeals_name, board_of_ed_name, party, date_mailed, date_registered,
+    local_id, year_of_birth, first_name, middle_name, last_name, suffix_name,
+    address_line_1, address_line_2, address_line_3, address_line_4, city, state,
+    zip, zip_plus_4, mailed, date_requested, date_returned, ballot_style, status
+)
+SELECT
+    '$ELECTION', precinct_name, precinct_code, precinct_code_with_split, city_or_village,
+    school_district, township, house_district, senate_district, congress_district,
+    police_district, road_district, fire_district, park_district,
+    court_appeals_name, board_of_ed_name, party, date_mailed, date_registered,
+    local_id, year_of_birth, first_name, middle_name, last_name, suffix_name,
+    address_line_1, address_line_2, address_line_3, address_line_4, city, state,
+    zip, zip_plus_4, mailed, date_requested, date_returned, ballot_style, status
+FROM $LEGACY_TABLE;
+
+SELECT 'Records imported' as metric, COUNT(*) as count
+FROM $TABLE_NAME WHERE election = '$ELECTION';
+EOF
+        echo "✓ Imported $LEGACY_TABLE into partition $PARTITION"
+        ;;
+
+    archive)
+        require_election
+        require_other_partitions
+        ARCHIVE_TABLE="${TABLE_NAME}_${ELECTION}"
+        # Swap the partition's data into a standalone table (metadata-only), then drop the empty partition
+        mysql -u "$DB_USER" -p"$DB_PASS" "$DB_NAME" << EOF
+CREATE TABLE $ARCHIVE_TABLE LIKE $TABLE_NAME;
+ALTER TABLE $ARCHIVE_TABLE REMOVE PARTITIONING;
+ALTER TABLE $TABLE_NAME EXCHANGE PARTITION $PARTITION WITH TABLE $ARCHIVE_TABLE;
+ALTER TABLE $TABLE_NAME DROP PARTITION $PARTITION;
+ALTER TABLE $CHANGES_TABLE DROP PARTITION $PARTITION;
+DROP TABLE IF EXISTS ${TABLE_NAME}_prev_${ELECTION};
+EOF
+        echo "✓ Archived $PARTITION to table $ARCHIVE_TABLE"
+        ;;
+
+    drop)
+        require_election
+        require_other_partitions
+        read -p "Drop all data for election $ELECTION? (yes/no): " confirm
+        if [ "$confirm" != "yes" ]; then
+            echo "Drop cancelled"
+            exit 0
+        fi
+        mysql -u "$DB_USER" -p"$DB_PASS" "$DB_NAME" << EOF
+ALTER TABLE $TABLE_NAME DROP PARTITION $PARTITION;
+ALTER TABLE $CHANGES_TABLE DROP PARTITION $PARTITION;
+DROP TABLE IF EXISTS ${TABLE_NAME}_prev_${ELECTION};
+EOF
+        echo "✓ Dropped partition $PARTITION"
+        ;;
+
+    *)
+        usage
+        ;;
+esac
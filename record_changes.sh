@@ -0,0 +1,146 @@
+#!/bin/bash
+# Record per-load change sets ("worklists") for the cure team
+# Usage: ./record_changes.sh snapshot <election>   (run BEFORE loading the new export)
+#        ./record_changes.sh diff <election>       (run AFTER loading the new export)
+#
+# snapshot copies the key columns of the election's current data into
+# ${TABLE_NAME}_prev_<election> (one per election, so loads of different
+# elections can run side by side). diff compares the freshly loaded election
+# against that snapshot and stores one row per voter per change type in the
+# election's partition of ${TABLE_NAME}_changes, tagged with the load time.
+# The viewer's "Changes since last load" filter and CSV export read only
+# these rows, so nobody has to re-sort the whole table to find what moved.
+#
+# Change types:
+#   new_request       - voter/request not present in the previous load
+#   new_return        - ballot returned since the previous load
+#   new_rejection     - status moved into a problem status (IDNOMATCH, NOSIG, NOID, ...)
+#   cured             - status moved from a problem status to VAL
+#   still_outstanding - not returned in either load
+#
+# Only the last CHANGE_SETS_KEEP loads (default 7) are kept per election; the
+# viewer only reads the latest, and still_outstanding alone is a large share
+# of the table on every load.
+
+set -e  # Exit on any error
+
+# Load environment variables from .env file
+if [ -f .env ]; then
+    export $(grep -v '^#' .env | xargs)
+else
+    echo "Error: .env file not found"
+    echo "Please copy .env.example to .env and configure your database credentials."
+    exit 1
+fi
+
+DB_USER="${DB_USER}"
+DB_PASS="${DB_PASS}"
+DB_NAME="${DB_NAME}"
+TABLE_NAME="${TABLE_NAME}"
+CHANGES_TABLE="${TABLE_NAME}_changes"
+CHANGE_SETS_KEEP="${CHANGE_SETS_KEEP:-7}"
+ELECTION="$2"
+
+if [[ ! "$ELECTION" =~ ^[A-Za-z0-9_]+$ ]]; then
+    echo "Usage: $0 snapshot|diff <election>"
+    exit 1
+fi
+PREV_TABLE="${TABLE_NAME}_prev_${ELECTION}"
+
+if [[ ! "$CHANGE_SETS_KEEP" =~ ^[1-9][0-9]*$ ]]; then
+    echo "Error: CHANGE_SETS_KEEP must be a positive number"
+    exit 1
+fi
+
+# A "problem" status is anything that is neither VAL nor outstanding (empty),
+# matching the red badge in the viewer.
+problem() { echo "($1 IS NOT NULL AND $1 <> '' AND $1 <> 'VAL')"; }
+outstanding() { echo "($1 IS NULL OR $1 = '')"; }
+
+case "$1" in
+    snapshot)
+        mysql -u "$DB_USER" -p"$DB_PASS" "$DB_NAME" << EOF
+DROP TABLE IF EXISTS $PREV_TABLE;
+CREATE TABLE $PREV_TABLE (INDEX idx_local_id (local_id))
+SELECT local_id, date_requested, date_returned, status
+FROM $TABLE_NAME WHERE election = '$ELECTION';
+EOF
+        PREV_COUNT=$(mysql -u "$DB_USER" -p"$DB_PASS" "$DB_NAME" -sN -e "SELECT COUNT(*) FROM $PREV_TABLE;")
+        echo "✓ Snapshot of previous load saved ($PREV_COUNT records)"
+        ;;
+
+    diff)
+        PREV_COUNT=$(mysql -u "$DB_USER" -p"$DB_PASS" "$DB_NAME" -sN -e "SELECT COUNT(*) FROM $PREV_TABLE;" 2>/dev/null || echo 0)
+        if [ "$PREV_COUNT" = "0" ]; then
+            echo "⚠ No previous load to compare against, skipping change sets"
+            exit 0
+        fi
+
+        LOAD_TIME=$(date "+%Y-%m-%d %H:%M:%S")
+        JOIN="p.local_id = t.local_id AND p.date_requested <=> t.date_requested"
+
+        mysql -u "$DB_USER" -p"$DB_PASS" "$DB_NAME" << EOF
+-- New requests: not in the previous load at all
+INSERT INTO $CHANGES_TABLE (election, load_time, change_type, local_id, date_requested, old_status, new_status)
+SELECT '$ELECTION', '$LOAD_TIME', 'new_request', t.local_id, t.date_requested, NULL, t.status
+FROM $TABLE_NAME t
+LEFT JOIN $PREV_TABLE p ON $JOIN
+WHERE t.election = '$ELECTION' AND p.local_id IS NULL;
+
+-- New returns: returned now, not returned (or not present) before
+INSERT INTO $CHANGES_TABLE (election, load_time, change_type, local_id, date_requested, old_status, new_status)
+SELECT '$ELECTION', '$LOAD_TIME', 'new_return', t.local_id, t.date_requested, p.status, t.status
+FROM $TABLE_NAME t
+LEFT JOIN $PREV_TABLE p ON $JOIN
+WHERE t.election = '$ELECTION' AND t.date_returned IS NOT NULL AND p.date_returned IS NULL;
+
+-- New rejections: now in a problem status that differs from before
+INSERT INTO $CHANGES_TABLE (election, load_time, change_type, local_id, date_requested, old_status, new_status)
+SELECT '$ELECTION', '$LOAD_TIME', 'new_rejection', t.local_id, t.date_requested, p.status, t.status
+FROM $TABLE_NAME t
+LEFT JOIN $PREV_TABLE p ON $JOIN
+WHERE t.election = '$ELECTION' AND $(problem t.status) AND NOT (p.status <=> t.status);
+
+-- Cured: was in a problem status, now VAL
+INSERT INTO $CHANGES_TABLE (election, load_time, change_type, local_id, date_requested, old_status, new_status)
+SELECT '$ELECTION', '$LOAD_TIME', 'cured', t.local_id, t.date_requested, p.status, t.status
+FROM $TABLE_NAME t
+INNER JOIN $PREV_TABLE p ON $JOIN
+WHERE t.election = '$ELECTION' AND $(problem p.status) AND t.status = 'VAL';
+
+-- Still outstanding: not returned in either load
+INSERT INTO $CHANGES_TABLE (election, load_time, change_type, local_id, date_requested, old_status, new_status)
+SELECT '$ELECTION', '$LOAD_TIME', 'still_outstanding', t.local_id, t.date_requested, p.status, t.status
+FROM $TABLE_NAME t
+INNER JOIN $PREV_TABLE p ON $JOIN
+WHERE t.election = '$ELECTION' AND $(outstanding p.status) AND $(outstanding t.status);
+
+-- Show statistics
+SELECT change_type, COUNT(*) as count
+FROM $CHANGES_TABLE
+WHERE election = '$ELECTION' AND load_time = '$LOAD_TIME'
+GROUP BY change_type;
+
+DROP TABLE IF EXISTS $PREV_TABLE;
+EOF
+        echo "✓ Change sets recorded for load at $LOAD_TIME"
+
+        # Retention: drop change sets older than the last CHANGE_SETS_KEEP loads
+        CUTOFF=$(mysql -u "$DB_USER" -p"$DB_PASS" "$DB_NAME" -sN -e "
+            SELECT DISTINCT load_time FROM $CHANGES_TABLE
+            WHERE election = '$ELECTION'
+            ORDER BY load_time DESC
+            LIMIT 1 OFFSET $((CHANGE_SETS_KEEP - 1));")
+        if [ -n "$CUTOFF" ]; then
+            mysql -u "$DB_USER" -p"$DB_PASS" "$DB_NAME" -e "
+                DELETE FROM $CHANGES_TABLE
+                WHERE election = '$ELECTION' AND load_time < '$CUTOFF';"
+            echo "✓ Kept change sets for the last $CHANGE_SETS_KEEP loads (since $CUTOFF)"
+        fi
+        ;;
+
+    *)
+        echo "Usage: $0 snapshot|diff <election>"
+        exit 1
+        ;;
+esac
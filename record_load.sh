@@ -0,0 +1,66 @@
+#!/bin/bash
+# Publish a load-metadata record for an election
+# Usage: ./record_load.sh <election> <csv_file> ["as of" date]
+#   "as of" date defaults to now; any format `date -d` accepts (e.g. "October 5, 2025")
+#
+# Each successful load appends one row to ${TABLE_NAME}_loads with the data's
+# "as of" timestamp, the election's row count, the SHA-256 of the loaded file
+# and a new data_version. The viewers show the latest row's date and use the
+# version as a cache key, so publishing a dataset needs no file edits,
+# redeploys or web server reloads.
+
+set -e  # Exit on any error
+
+# Load environment variables from .env file
+if [ -f .env ]; then
+    export $(grep -v '^#' .env | xargs)
+else
+    echo "Error: .env file not found"
+    echo "Please copy .env.example to .env and configure your database credentials."
+    exit 1
+fi
+
+DB_USER="${DB_USER}"
+DB_PASS="${DB_PASS}"
+DB_NAME="${DB_NAME}"
+TABLE_NAME="${TABLE_NAME}"
+LOADS_TABLE="${TABLE_NAME}_loads"
+ELECTION="$1"
+CSV_FILE="$2"
+
+if [[ ! "$ELECTION" =~ ^[A-Za-z0-9_]+$ ]] || [ ! -f "$CSV_FILE" ]; then
+    echo "Usage: $0 <election> <csv_file> [\"as of\" date]"
+    exit 1
+fi
+
+if ! AS_OF=$(date -d "${3:-now}" "+%Y-%m-%d %H:%M:%S" 2>/dev/null); then
+    echo "Error: Could not parse date '$3'"
+    exit 1
+fi
+
+SOURCE_HASH=$(sha256sum "$CSV_FILE" | cut -d' ' -f1)
+
+mysql -u "$DB_USER" -p"$DB_PASS" "$DB_NAME" << EOF
+CREATE TABLE IF NOT EXISTS $LOADS_TABLE (
+    data_version INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    election VARCHAR(32) NOT NULL,
+    loaded_at DATETIME NOT NULL,
+    data_as_of DATETIME NOT NULL,
+    row_count INT NOT NULL,
+    source_sha256 CHAR(64) NOT NULL,
+    INDEX idx_election_version (election, data_version)
+);
+
+INSERT INTO $LOADS_TABLE (election, loaded_at, data_as_of, row_count, source_sha256)
+SELECT '$ELECTION', NOW(), '$AS_OF', COUNT(*), '$SOURCE_HASH'
+FROM $TABLE_NAME
+WHERE election = '$ELECTION';
+
+SELECT data_version, data_as_of, row_count
+FROM $LOADS_TABLE
+WHERE election = '$ELECTION'
+ORDER BY data_version DESC
+LIMIT 1;
+EOF
+
+echo "✓ Load metadata published (as of $AS_OF)"
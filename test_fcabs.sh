@@ -0,0 +1,136 @@
+#!/usr/bin/env bash
+# Check fcabs.sh's conditional download and skip-if-unchanged logic against a
+# local stand-in for the county site (no network, no database needed)
+# Usage: ./test_fcabs.sh
+#
+# The stand-in serves the ASP.NET form page on GET and the export on POST,
+# honoring If-None-Match / If-Modified-Since like the real server. A stub
+# update_and_refresh.sh records each load instead of touching MySQL.
+set -euo pipefail
+
+SCRIPT_DIR="$(cd "$(dirname "$0")" && pwd)"
+WORK=$(mktemp -d)
+SERVER_PID=""
+cleanup() {
+    [ -n "$SERVER_PID" ] && kill "$SERVER_PID" 2>/dev/null || true
+    rm -rf "$WORK"
+}
+trap cleanup EXIT
+
+mkdir -p "$WORK/source" "$WORK/state"
+LOADS="$WORK/loads.log"
+: > "$LOADS"
+
+cat > "$WORK/source/update_and_refresh.sh" << EOF
+#!/bin/bash
+echo "\$@" >> "$LOADS"
+EOF
+chmod +x "$WORK/source/update_and_refresh.sh"
+
+# Stand-in server; its response is driven by $WORK/export.json
+cat > "$WORK/server.py" << 'EOF'
+import json, sys
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+CONFIG = sys.argv[1]
+PAGE = (b'<input type="hidden" name="__VIEWSTATE" id="__VIEWSTATE" value="vs" />'
+        b'<input type="hidden" name="__VIEWSTATEGENERATOR" id="__VIEWSTATEGENERATOR" value="g" />'
+        b'<input type="hidden" name="__EVENTVALIDATION" id="__EVENTVALIDATION" value="ev" />'
+        b'<input name="__RequestVerificationToken" type="hidden" value="tok" />')
+
+class Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(PAGE)))
+        self.end_headers()
+        self.wfile.write(PAGE)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        with open(CONFIG) as f:
+            export = json.load(f)
+        if export.get('etag') and self.headers.get('If-None-Match'):
+            not_modified = self.headers['If-None-Match'] == export['etag']
+        else:
+            not_modified = self.headers.get('If-Modified-Since') == export['last_modified']
+        if not_modified:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = export['body'].encode()
+        self.send_response(200)
+        if export.get('etag'):
+            self.send_header('ETag', export['etag'])
+        self.send_header('Last-Modified', export['last_modified'])
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+HTTPServer(('127.0.0.1', int(sys.argv[2])), Handler).serve_forever()
+EOF
+
+PORT=$(python3 -c 'import socket; s = socket.socket(); s.bind(("127.0.0.1", 0)); print(s.getsockname()[1])')
+serve() {  # serve <body> <etag or ""> <last-modified>
+    python3 -c 'import json, sys; json.dump({"body": sys.argv[1], "etag": sys.argv[2], "last_modified": sys.argv[3]}, open(sys.argv[4], "w"))' \
+        "$1" "$2" "$3" "$WORK/export.json"
+}
+
+serve $'PRECINCT NAME\tVAL/REJECTED\nA\tVAL\n' '"v1"' 'Mon, 03 Nov 2025 10:00:00 GMT'
+python3 "$WORK/server.py" "$WORK/export.json" "$PORT" &
+SERVER_PID=$!
+for _ in $(seq 50); do
+    curl -s -o /dev/null "http://127.0.0.1:$PORT/" && break
+    sleep 0.1
+done
+
+FAILED=0
+fetch() {
+    FCABS_URL="http://127.0.0.1:$PORT/" SOURCE_DIR="$WORK/source" FCABS_STATE_DIR="$WORK/state" \
+        "$SCRIPT_DIR/fcabs.sh" -y test_election > "$WORK/out.log" 2>&1 || {
+        echo "fcabs.sh failed:"; cat "$WORK/out.log"; exit 1; }
+}
+expect_loads() {  # expect_loads <count> <description>
+    local count
+    count=$(wc -l < "$LOADS")
+    if [ "$count" = "$1" ]; then
+        echo "✓ $2"
+    else
+        echo "✗ $2 (expected $1 loads, got $count)"
+        sed 's/^/    /' "$WORK/out.log"
+        FAILED=1
+    fi
+}
+
+fetch
+expect_loads 1 "first fetch loads the export"
+
+fetch
+expect_loads 1 "unchanged ETag: server answers 304, nothing loaded"
+
+serve $'PRECINCT NAME\tVAL/REJECTED\nA\tVAL\nB\tNOSIG\n' '"v2"' 'Mon, 03 Nov 2025 10:00:00 GMT'
+fetch
+expect_loads 2 "new ETag with the same Last-Modified is loaded"
+
+serve $'PRECINCT NAME\tVAL/REJECTED\nA\tVAL\nB\tNOSIG\n' '"v3"' 'Tue, 04 Nov 2025 10:00:00 GMT'
+fetch
+expect_loads 2 "new ETag but identical content: hash matches, nothing loaded"
+
+# Server without ETags: fall back to If-Modified-Since
+rm -f "$WORK/state/export.etag"
+serve $'PRECINCT NAME\tVAL/REJECTED\nA\tVAL\nB\tNOSIG\n' '' 'Tue, 04 Nov 2025 10:00:00 GMT'
+fetch
+expect_loads 2 "no ETag, same Last-Modified: server answers 304, nothing loaded"
+
+serve $'PRECINCT NAME\tVAL/REJECTED\nA\tVAL\nB\tVAL\n' '' 'Wed, 05 Nov 2025 10:00:00 GMT'
+fetch
+expect_loads 3 "no ETag, newer Last-Modified is loaded"
+
+if [ "$(head -1 /tmp/fcabs.csv)" != $'PRECINCT_NAME\tstatus' ]; then
+    echo "✗ header not preprocessed: $(head -1 /tmp/fcabs.csv)"
+    FAILED=1
+fi
+
+exit $FAILED
@@ -1,7 +1,9 @@
 #!/bin/bash
 
-# Script to update fcabs database and refresh the "Data as of" date
-# Usage: ./update_and_refresh.sh <csv_file>
+# Script to update fcabs database and publish the new "Data as of" date
+# Usage: ./update_and_refresh.sh [-y] <csv_file> [election]
+#   -y        don't prompt (for cron)
+#   election  defaults to ELECTION from .env (e.g. 2025_general)
 
 set -e  # Exit on any error
 
@@ -20,6 +22,13 @@ else
     exit 1
 fi
 
+# Non-interactive mode
+ASSUME_YES=false
+if [ "$1" = "-y" ]; then
+    ASSUME_YES=true
+    shift
+fi
+
 # Database configuration from environment variables
 DB_USER="${DB_USER}"
 DB_PASS="${DB_PASS}"
@@ -29,12 +38,22 @@ TABLE_NAME="${TABLE_NAME}"
 # Check if CSV file argument provided
 if [ -z "$1" ]; then
     echo -e "${RED}Error: No CSV file specified${NC}"
-    echo "Usage: $0 <csv_file>"
-    echo "Example: $0 fcabs1105.csv"
+    echo "Usage: $0 [-y] <csv_file> [election]"
+    echo "Example: $0 fcabs1105.csv 2025_general"
     exit 1
 fi
 
 CSV_FILE="$1"
+ELECTION="${2:-$ELECTION}"
+
+# Election names become partition names, so keep them simple
+if [[ ! "$ELECTION" =~ ^[A-Za-z0-9_]+$ ]]; then
+    echo -e "${RED}Error: Invalid or missing election '$ELECTION'${NC}"
+    echo "Pass it as the second argument or set ELECTION in .env"
+    exit 1
+fi
+PARTITION="p_$ELECTION"
+STAGE_TABLE="${TABLE_NAME}_stage_${ELECTION}"
 
 # Check if file exists
 if [ ! -f "$CSV_FILE" ]; then
@@ -53,32 +72,46 @@ echo "CSV File: $CSV_FILE"
 echo "Data Date: $NEW_DATE"
 echo "Database: $DB_NAME"
 echo "Table: $TABLE_NAME"
+echo "Election: $ELECTION"
 echo ""
 
 # Confirm before proceeding
-read -p "Proceed with update? (y/n) " -n 1 -r
-echo
+if [ "$ASSUME_YES" = true ]; then
+    REPLY=y
+else
+    read -p "Proceed with update? (y/n) " -n 1 -r
+    echo
+fi
 if [[ ! $REPLY =~ ^[Yy]$ ]]; then
     echo -e "${YELLOW}Update cancelled${NC}"
-    exit 0
+    exit 1
 fi
 
 # Step 1: Get record count before clearing
 echo ""
 echo -e "${GREEN}Step 1: Checking current data...${NC}"
 
-MAIN_COUNT_BEFORE=$(mysql -u "$DB_USER" -p"$DB_PASS" "$DB_NAME" -sN -e "SELECT COUNT(*) FROM $TABLE_NAME;")
-echo "Records in table (before): $MAIN_COUNT_BEFORE"
+# Make sure this election has its own partition
+./manage_elections.sh add "$ELECTION"
+
+MAIN_COUNT_BEFORE=$(mysql -u "$DB_USER" -p"$DB_PASS" "$DB_NAME" -sN -e "SELECT COUNT(*) FROM $TABLE_NAME WHERE election = '$ELECTION';")
+echo "Records in election (before): $MAIN_COUNT_BEFORE"
+
+# Snapshot the previous load so we can compute what changed
+./record_changes.sh snapshot "$ELECTION"
 
-# Step 2: Clear the table
+# Step 2: Build the new data in a staging table; the viewers keep reading the
+# current partition (never an empty or half-loaded one) until it is swapped in
 echo ""
-echo -e "${GREEN}Step 2: Clearing existing data...${NC}"
+echo -e "${GREEN}Step 2: Preparing staging table...${NC}"
 
 mysql -u "$DB_USER" -p"$DB_PASS" "$DB_NAME" << EOF
-TRUNCATE TABLE $TABLE_NAME;
+DROP TABLE IF EXISTS $STAGE_TABLE;
+CREATE TABLE $STAGE_TABLE LIKE $TABLE_NAME;
+ALTER TABLE $STAGE_TABLE REMOVE PARTITIONING;
 EOF
 
-echo -e "${GREEN}✓ Table cleared${NC}"
+echo -e "${GREEN}✓ Staging table $STAGE_TABLE created${NC}"
 
 # Step 3: Load new data
 echo ""
@@ -86,12 +119,12 @@ echo -e "${GREEN}Step 3: Loading new data from CSV...${NC}"
 
 mysql -u "$DB_USER" -p"$DB_PASS" "$DB_NAME" << EOF
 -- Disable keys for faster loading
-ALTER TABLE $TABLE_NAME DISABLE KEYS;
+ALTER TABLE $STAGE_TABLE DISABLE KEYS;
 
 -- Load data from CSV (preprocessed with underscores and status field)
 -- First specify CSV column order, then map to table columns
 LOAD DATA LOCAL INFILE '$CSV_FILE'
-INTO TABLE $TABLE_NAME
+INTO TABLE $STAGE_TABLE
 FIELDS TERMINATED BY '\t'
 LINES TERMINATED BY '\n'
 IGNORE 1 LINES
@@ -103,6 +136,7 @@ IGNORE 1 LINES
  @ADDRESS_LINE_3, @ADDRESS_LINE_4, @CITY, @STATE, @ZIP, @ZIP_PLUS_4, @MAILED,
  @DATE_REQUESTED, @DATE_RETURNED, @BALLOT_STYLE, @status)
 SET
+    election = '$ELECTION',
     precinct_name = NULLIF(@PRECINCT_NAME, ''),
     precinct_code = NULLIF(@PRECINCT_CODE, ''),
     precinct_code_with_split = NULLIF(@PRECINCT_CODE_WITH_SPLIT, ''),
@@ -142,56 +176,31 @@ SET
     status = NULLIF(@status, '');
 
 -- Re-enable keys
-ALTER TABLE $TABLE_NAME ENABLE KEYS;
+ALTER TABLE $STAGE_TABLE ENABLE KEYS;
+
+-- Swap the new data in (metadata-only), replacing this election's partition;
+-- other elections are untouched
+ALTER TABLE $TABLE_NAME EXCHANGE PARTITION $PARTITION WITH TABLE $STAGE_TABLE;
+DROP TABLE $STAGE_TABLE;
 EOF
 
-MAIN_COUNT_AFTER=$(mysql -u "$DB_USER" -p"$DB_PASS" "$DB_NAME" -sN -e "SELECT COUNT(*) FROM $TABLE_NAME;")
+MAIN_COUNT_AFTER=$(mysql -u "$DB_USER" -p"$DB_PASS" "$DB_NAME" -sN -e "SELECT COUNT(*) FROM $TABLE_NAME WHERE election = '$ELECTION';")
 
 echo -e "${GREEN}✓ Data loaded successfully${NC}"
 echo "Records loaded: $MAIN_COUNT_AFTER"
 
-# Step 4: Update dates in viewer files
+# Record change sets (new requests/returns/rejections, cured) for this load
 echo ""
-echo -e "${GREEN}Step 4: Updating 'Data as of' date in viewer files...${NC}"
+echo -e "${GREEN}Recording changes since last load...${NC}"
+./record_changes.sh diff "$ELECTION"
 
-# Update PHP file
-if [ -f "voter_viewer.php" ]; then
-    sed -i "s|Data as of: .*</strong>|Data as of: <strong>$NEW_DATE</strong>|" voter_viewer.php
-    echo -e "${GREEN}✓ Updated voter_viewer.php${NC}"
-else
-    echo -e "${YELLOW}⚠ voter_viewer.php not found${NC}"
-fi
-
-# Update Python file
-if [ -f "voter_viewer.py" ]; then
-    sed -i "s|Data as of: .*</strong>|Data as of: <strong>$NEW_DATE</strong>|" voter_viewer.py
-    echo -e "${GREEN}✓ Updated voter_viewer.py${NC}"
-else
-    echo -e "${YELLOW}⚠ voter_viewer.py not found${NC}"
-fi
-
-# Step 5: Deploy to production
+# Step 4: Publish load metadata; the viewers pick up the new "Data as of" date and
+# data version from the database, so no viewer files are edited or redeployed
 echo ""
-echo -e "${GREEN}Step 5: Deploying to production...${NC}"
+echo -e "${GREEN}Step 4: Publishing load metadata...${NC}"
+./record_load.sh "$ELECTION" "$CSV_FILE"
 
-if [ -f "deploy_viewer.sh" ]; then
-    # Ask for confirmation
-    read -p "Deploy to /var/www/html/ionic/fcabs/? (y/n) " -n 1 -r
-    echo
-    if [[ $REPLY =~ ^[Yy]$ ]]; then
-        ./deploy_viewer.sh
-        echo -e "${GREEN}✓ Deployed to production${NC}"
-        DEPLOYED=true
-    else
-        echo -e "${YELLOW}⚠ Deployment skipped${NC}"
-        DEPLOYED=false
-    fi
-else
-    echo -e "${YELLOW}⚠ deploy_viewer.sh not found, skipping deployment${NC}"
-    DEPLOYED=false
-fi
-
-# Step 6: Summary
+# Step 5: Summary
 echo ""
 echo -e "${GREEN}========================================${NC}"
 echo -e "${GREEN}Update Complete!${NC}"
@@ -199,22 +208,10 @@ echo -e "${GREEN}========================================${NC}"
 echo ""
 echo "Summary:"
 echo "  • CSV file: $CSV_FILE"
+echo "  • Election: $ELECTION"
 echo "  • Data date: $NEW_DATE"
 echo "  • Records before: $MAIN_COUNT_BEFORE"
 echo "  • Records after: $MAIN_COUNT_AFTER"
-if [ "$DEPLOYED" = true ]; then
-    echo "  • Deployed: Yes"
-else
-    echo "  • Deployed: No"
-fi
 echo ""
-echo "Next steps:"
-if [ "$DEPLOYED" = false ]; then
-    echo "  1. If needed, run: ./deploy_viewer.sh"
-    echo "  2. Commit changes: git add . && git commit -m 'Update data for $NEW_DATE'"
-else
-    echo "  1. Verify the site looks correct"
-    echo "  2. Commit changes: git add . && git commit -m 'Update data for $NEW_DATE'"
-fi
+echo "The viewers show the new data and date within a minute (metadata is cached briefly)."
 echo ""
-
@@ -1,17 +1,47 @@
 #!/bin/bash
-# Update the "Data as of" date in the voter viewer files
-# Usage: ./update_data_date.sh "October 5, 2025"
+# Correct the "Data as of" date shown by the voter viewers
+# Usage: ./update_data_date.sh "October 5, 2025" [election]
 #    or: ./update_data_date.sh  (prompts for date)
+#
+# The date is read from the latest row of ${TABLE_NAME}_loads (see
+# record_load.sh), so this publishes a copy of that row with the new date.
+# Nothing is edited or redeployed; the viewers pick it up within a minute.
 
-SOURCE_DIR="/home/jmknapp/indivisible"
-PHP_FILE="$SOURCE_DIR/voter_viewer.php"
-PY_FILE="$SOURCE_DIR/voter_viewer.py"
-DEPLOY_DIR="/var/www/html/ionic/fcabs"
+# Load environment variables from .env file
+if [ -f .env ]; then
+    export $(grep -v '^#' .env | xargs)
+else
+    echo "Error: .env file not found"
+    echo "Please copy .env.example to .env and configure your database credentials."
+    exit 1
+fi
+
+DB_USER="${DB_USER}"
+DB_PASS="${DB_PASS}"
+DB_NAME="${DB_NAME}"
+TABLE_NAME="${TABLE_NAME}"
+LOADS_TABLE="${TABLE_NAME}_loads"
+ELECTION="${2:-$ELECTION}"
+
+if [[ ! "$ELECTION" =~ ^[A-Za-z0-9_]+$ ]]; then
+    echo "Error: Invalid or missing election '$ELECTION'"
+    echo "Pass it as the second argument or set ELECTION in .env"
+    exit 1
+fi
+
+CURRENT=$(mysql -u "$DB_USER" -p"$DB_PASS" "$DB_NAME" -sN -e "
+    SELECT DATE_FORMAT(data_as_of, '%M %e, %Y') FROM $LOADS_TABLE
+    WHERE election = '$ELECTION' ORDER BY data_version DESC LIMIT 1;" 2>/dev/null)
+
+if [ -z "$CURRENT" ]; then
+    echo "Error: No load recorded for election $ELECTION yet"
+    echo "Load data with ./update_and_refresh.sh, or run ./record_load.sh <election> <csv_file> [date]"
+    exit 1
+fi
 
 # Get the new date
 if [ -z "$1" ]; then
-    echo "Current date in files:"
-    grep -A 1 "Data as of:" "$PHP_FILE" | grep "strong" | sed 's/.*<strong>\(.*\)<\/strong>.*/  \1/'
+    echo "Current date for $ELECTION: $CURRENT"
     echo ""
     read -p "Enter new date (e.g., October 5, 2025): " NEW_DATE
 else
@@ -23,47 +53,23 @@ if [ -z "$NEW_DATE" ]; then
     exit 1
 fi
 
-echo "Updating data date to: $NEW_DATE"
-echo ""
-
-# Update PHP file
-if [ -f "$PHP_FILE" ]; then
-    sed -i "s/Data as of: <strong>.*<\/strong>/Data as of: <strong>$NEW_DATE<\/strong>/" "$PHP_FILE"
-    echo "✅ Updated: $PHP_FILE"
-else
-    echo "⚠️  Not found: $PHP_FILE"
+if ! AS_OF=$(date -d "$NEW_DATE" "+%Y-%m-%d %H:%M:%S" 2>/dev/null); then
+    echo "Error: Could not parse date '$NEW_DATE'"
+    exit 1
 fi
 
-# Update Python file
-if [ -f "$PY_FILE" ]; then
-    sed -i "s/Data as of: <strong>.*<\/strong>/Data as of: <strong>$NEW_DATE<\/strong>/" "$PY_FILE"
-    echo "✅ Updated: $PY_FILE"
-else
-    echo "⚠️  Not found: $PY_FILE"
-fi
+echo "Updating data date to: $NEW_DATE"
+echo ""
 
-# Update deployed version if it exists
-if [ -f "$DEPLOY_DIR/index.php" ]; then
-    echo ""
-    read -p "Update deployed version at $DEPLOY_DIR? (y/n): " -n 1 -r
-    echo ""
-    if [[ $REPLY =~ ^[Yy]$ ]]; then
-        sudo sed -i "s/Data as of: <strong>.*<\/strong>/Data as of: <strong>$NEW_DATE<\/strong>/" "$DEPLOY_DIR/index.php"
-        echo "✅ Updated: $DEPLOY_DIR/index.php"
-        
-        # Optionally reload Apache
-        if systemctl is-active --quiet apache2; then
-            sudo systemctl reload apache2
-            echo "✅ Apache reloaded"
-        elif systemctl is-active --quiet httpd; then
-            sudo systemctl reload httpd
-            echo "✅ httpd reloaded"
-        fi
-    fi
-fi
+# Same data, new date: bump data_version so cached pages are refreshed
+mysql -u "$DB_USER" -p"$DB_PASS" "$DB_NAME" << EOF
+INSERT INTO $LOADS_TABLE (election, loaded_at, data_as_of, row_count, source_sha256)
+SELECT election, loaded_at, '$AS_OF', row_count, source_sha256
+FROM $LOADS_TABLE
+WHERE election = '$ELECTION'
+ORDER BY data_version DESC
+LIMIT 1;
+EOF
 
-echo ""
 echo "✅ Data date update complete!"
 echo "   New date: $NEW_DATE"
-
-
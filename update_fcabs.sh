@@ -1,6 +1,9 @@
 #!/bin/bash
 # Daily update script for Franklin County absentee ballot data
-# Usage: ./update_fcabs.sh <new_csv_file>
+# Usage: ./update_fcabs.sh <new_csv_file> [election]
+#   election defaults to ELECTION from .env (e.g. 2025_general)
+
+set -e  # Exit on any error, so a failed load is never published
 
 # Load environment variables from .env file
 if [ -f .env ]; then
@@ -17,9 +20,16 @@ DB_PASS="${DB_PASS}"
 DB_NAME="${DB_NAME}"
 TABLE_NAME="${TABLE_NAME}"
 TEMP_TABLE="${TABLE_NAME}_temp"
+ELECTION="${2:-$ELECTION}"
 
 if [ -z "$CSV_FILE" ]; then
-    echo "Usage: $0 <csv_file>"
+    echo "Usage: $0 <csv_file> [election]"
+    exit 1
+fi
+
+if [[ ! "$ELECTION" =~ ^[A-Za-z0-9_]+$ ]]; then
+    echo "Error: Invalid or missing election '$ELECTION'"
+    echo "Pass it as the second argument or set ELECTION in .env"
     exit 1
 fi
 
@@ -30,12 +40,17 @@ fi
 
 echo "Starting update process..."
 echo "CSV file: $CSV_FILE"
+echo "Election: $ELECTION"
 echo "Date: $(date)"
 
+# Make sure this election has its own partition
+./manage_elections.sh add "$ELECTION"
+
 # Step 1: Create temporary table with same structure
 mysql -u "$DB_USER" -p"$DB_PASS" "$DB_NAME" << EOF
 DROP TABLE IF EXISTS $TEMP_TABLE;
 CREATE TABLE $TEMP_TABLE LIKE $TABLE_NAME;
+ALTER TABLE $TEMP_TABLE REMOVE PARTITIONING;
 
 -- Remove auto-increment from temp table
 ALTER TABLE $TEMP_TABLE MODIFY id INT;
@@ -58,6 +73,7 @@ IGNORE 1 LINES
  address_line_1, address_line_2, address_line_3, address_line_4, city, state,
  zip, zip_plus_4, mailed, @date_requested, @date_returned, ballot_style, status)
 SET
+ election = '$ELECTION',
  date_mailed = STR_TO_DATE(SUBSTRING_INDEX(@date_mailed, ' ', 1), '%m/%d/%Y'),
  date_registered = STR_TO_DATE(SUBSTRING_INDEX(@date_registered, ' ', 1), '%m/%d/%Y'),
  date_requested = STR_TO_DATE(SUBSTRING_INDEX(@date_requested, ' ', 1), '%m/%d/%Y'),
@@ -66,11 +82,17 @@ EOF
 
 echo "✓ Data loaded into temporary table"
 
+# Snapshot the previous load so we can compute what changed
+./record_changes.sh snapshot "$ELECTION"
+
 # Step 3: Update existing records and insert new ones
-mysql -u "$DB_USER" -p"$DB_PASS" "$DB_NAME" << 'EOF'
--- Update existing records (based on local_id)
-UPDATE fcabs2025 f
-INNER JOIN fcabs2025_temp t ON f.local_id = t.local_id
+mysql -u "$DB_USER" -p"$DB_PASS" "$DB_NAME" << EOF
+-- One transaction, so readers never see the updates without the new inserts
+START TRANSACTION;
+
+-- Update existing records (based on local_id, within this election)
+UPDATE $TABLE_NAME f
+INNER JOIN $TEMP_TABLE t ON f.local_id = t.local_id AND f.election = t.election
 SET 
     f.precinct_name = t.precinct_name,
     f.precinct_code = t.precinct_code,
@@ -110,8 +132,8 @@ SET
     f.status = t.status;
 
 -- Insert new records (that don't exist in main table)
-INSERT INTO fcabs2025 (
-    precinct_name, precinct_code, precinct_code_with_split, city_or_village,
+INSERT INTO $TABLE_NAME (
+    election, precinct_name, precinct_code, precinct_code_with_split, city_or_village,
     school_district, township, house_district, senate_district, congress_district,
     police_district, road_district, fire_district, park_district,
     court_appeals_name, board_of_ed_name, party, date_mailed, date_registered,
@@ -120,43 +142,44 @@ INSERT INTO fcabs2025 (
     zip, zip_plus_4, mailed, date_requested, date_returned, ballot_style, status
 )
 SELECT 
-    t.precinct_name, t.precinct_code, t.precinct_code_with_split, t.city_or_village,
+    t.election, t.precinct_name, t.precinct_code, t.precinct_code_with_split, t.city_or_village,
     t.school_district, t.township, t.house_district, t.senate_district, t.congress_district,
     t.police_district, t.road_district, t.fire_district, t.park_district,
     t.court_appeals_name, t.board_of_ed_name, t.party, t.date_mailed, t.date_registered,
     t.local_id, t.year_of_birth, t.first_name, t.middle_name, t.last_name, t.suffix_name,
     t.address_line_1, t.address_line_2, t.address_line_3, t.address_line_4, t.city, t.state,
     t.zip, t.zip_plus_4, t.mailed, t.date_requested, t.date_returned, t.ballot_style, t.status
-FROM fcabs2025_temp t
-LEFT JOIN fcabs2025 f ON t.local_id = f.local_id
+FROM $TEMP_TABLE t
+LEFT JOIN $TABLE_NAME f ON t.local_id = f.local_id AND f.election = t.election
 WHERE f.local_id IS NULL;
 
+COMMIT;
+
 -- Get statistics
 SELECT 
     'Records in temp table' as metric, 
     COUNT(*) as count 
-FROM fcabs2025_temp
+FROM $TEMP_TABLE
 UNION ALL
 SELECT 
-    'Records in main table after update', 
+    'Records in election after update', 
     COUNT(*) 
-FROM fcabs2025;
+FROM $TABLE_NAME
+WHERE election = '$ELECTION';
 EOF
 
 echo "✓ Records updated and new records inserted"
 
+# Record change sets (new requests/returns/rejections, cured) for this load
+./record_changes.sh diff "$ELECTION"
+
 # Step 4: Cleanup
 mysql -u "$DB_USER" -p"$DB_PASS" "$DB_NAME" << EOF
 DROP TABLE IF EXISTS $TEMP_TABLE;
 EOF
 
 echo "✓ Cleanup complete"
-echo "Update finished successfully at $(date)"
-echo ""
-echo "================================================"
-echo "📅 REMINDER: Update the 'Data as of' date"
-echo "================================================"
-echo "Run: ./update_data_date.sh \"Month DD, YYYY\""
-echo "Example: ./update_data_date.sh \"October 5, 2025\""
-echo "================================================"
 
+# Publish the new "Data as of" date and data version for the viewers
+./record_load.sh "$ELECTION" "$CSV_FILE"
+echo "Update finished successfully at $(date)"
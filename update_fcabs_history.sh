@@ -1,7 +1,10 @@
 #!/bin/bash
 # Daily update script for Franklin County absentee ballot data (HISTORICAL VERSION)
 # This version keeps all historical records - multiple entries per voter
-# Usage: ./update_fcabs_history.sh <new_csv_file>
+# Usage: ./update_fcabs_history.sh <new_csv_file> [election]
+#   election defaults to ELECTION from .env (e.g. 2025_general)
+
+set -e  # Exit on any error, so a failed load is never published
 
 # Load environment variables from .env file
 if [ -f .env ]; then
@@ -18,12 +21,20 @@ DB_PASS="${DB_PASS}"
 DB_NAME="${DB_NAME}"
 TABLE_NAME="${TABLE_NAME}"
 TEMP_TABLE="${TABLE_NAME}_temp"
+ELECTION="${2:-$ELECTION}"
 
 if [ -z "$CSV_FILE" ]; then
-    echo "Usage: $0 <csv_file>"
+    echo "Usage: $0 <csv_file> [election]"
     exit 1
 fi
 
+if [[ ! "$ELECTION" =~ ^[A-Za-z0-9_]+$ ]]; then
+    echo "Error: Invalid or missing election '$ELECTION'"
+    echo "Pass it as the second argument or set ELECTION in .env"
+    exit 1
+fi
+PARTITION="p_$ELECTION"
+
 if [ ! -f "$CSV_FILE" ]; then
     echo "Error: File $CSV_FILE not found"
     exit 1
@@ -31,21 +42,34 @@ fi
 
 echo "Starting update process (HISTORICAL MODE)..."
 echo "CSV file: $CSV_FILE"
+echo "Election: $ELECTION"
 echo "Date: $(date)"
 
+# Make sure this election has its own partition
+./manage_elections.sh add "$ELECTION"
+
 # Step 1: Add unique constraint if not exists (local_id + date_requested combination)
-mysql -u "$DB_USER" -p"$DB_PASS" "$DB_NAME" << 'EOF'
--- Check and add unique index on local_id + date_requested
-ALTER TABLE fcabs1004 ADD UNIQUE INDEX idx_voter_request (local_id, date_requested);
+# (unique keys on a partitioned table must include the partitioning column)
+INDEX_EXISTS=$(mysql -u "$DB_USER" -p"$DB_PASS" "$DB_NAME" -sN -e "
+    SELECT COUNT(*) FROM information_schema.STATISTICS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = '$TABLE_NAME'
+      AND INDEX_NAME = 'idx_voter_request';")
+if [ "$INDEX_EXISTS" = "0" ]; then
+    mysql -u "$DB_USER" -p"$DB_PASS" "$DB_NAME" << EOF
+ALTER TABLE $TABLE_NAME ADD UNIQUE INDEX idx_voter_request (local_id, date_requested, election);
 EOF
+fi
 
 echo "✓ Unique index verified"
 
+# Snapshot the previous load so we can compute what changed
+./record_changes.sh snapshot "$ELECTION"
+
 # Step 2: Load data with ON DUPLICATE KEY UPDATE
 # This will update existing combinations and insert new ones
 mysql -u "$DB_USER" -p"$DB_PASS" --local-infile=1 "$DB_NAME" << EOF
 LOAD DATA LOCAL INFILE '$CSV_FILE'
-INTO TABLE $TABLE_NAME
+INTO TABLE $TABLE_NAME PARTITION ($PARTITION)
 FIELDS TERMINATED BY '\t'
 LINES TERMINATED BY '\n'
 IGNORE 1 LINES
@@ -57,6 +81,7 @@ IGNORE 1 LINES
  address_line_1, address_line_2, address_line_3, address_line_4, city, state,
  zip, zip_plus_4, mailed, @date_requested, @date_returned, ballot_style, status)
 SET
+ election = '$ELECTION',
  date_mailed = STR_TO_DATE(SUBSTRING_INDEX(@date_mailed, ' ', 1), '%m/%d/%Y'),
  date_registered = STR_TO_DATE(SUBSTRING_INDEX(@date_registered, ' ', 1), '%m/%d/%Y'),
  date_requested = STR_TO_DATE(SUBSTRING_INDEX(@date_requested, ' ', 1), '%m/%d/%Y'),
@@ -100,16 +125,24 @@ ON DUPLICATE KEY UPDATE
 
 -- Show statistics
 SELECT 
-    'Total records in table' as metric, 
+    'Total records in election' as metric, 
     COUNT(*) as count 
-FROM fcabs1004
+FROM $TABLE_NAME
+WHERE election = '$ELECTION'
 UNION ALL
 SELECT 
     'Unique voters', 
     COUNT(DISTINCT local_id) 
-FROM fcabs1004;
+FROM $TABLE_NAME
+WHERE election = '$ELECTION';
 EOF
 
 echo "✓ Data loaded with duplicate handling"
+
+# Record change sets (new requests/returns/rejections, cured) for this load
+./record_changes.sh diff "$ELECTION"
+
+# Publish the new "Data as of" date and data version for the viewers
+./record_load.sh "$ELECTION" "$CSV_FILE"
 echo "Update finished successfully at $(date)"
 
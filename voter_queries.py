@@ -0,0 +1,298 @@
+"""
+Prepared-statement query layer for the Voter Viewer
+
+Every query the viewer runs is one of a fixed set of statements with a stable
+id (e.g. "voters:status,party:city:desc:limit"). Filter values are always
+bound parameters; only whitelisted filter shapes and sort keys pick the
+statement, so the SQL text never depends on user input.
+
+Statements are prepared once per pooled connection (the caller says which
+connections are pooled; see ConnectionPool in voter_viewer.py) and this layer
+keeps the prepared cursors for each, so pooled connections skip the parse/plan
+step on every request. Each connection keeps at most PREPARED_PER_CONNECTION of them
+(least recently used are closed) to stay well under the server's
+max_prepared_stmt_count. Results can also be cached in-process keyed on
+(statement id, bound parameters, data_version), where data_version is the one
+the viewer last read from the load metadata (see record_load.sh). The loaders
+swap each load in atomically (update_and_refresh.sh exchanges a staging table
+into the partition, update_fcabs.sh merges in one transaction), so a cached
+result is always a complete load. Rows read after a swap but before its
+version is published are cached under the previous version; they are newer,
+not partial, and drop out once the viewer sees the new data_version (within
+its metadata TTL).
+"""
+
+from collections import OrderedDict
+import threading
+
+# ORDER BY for each sort key, with secondary sort by name
+SORT_ORDERS = {
+    'name': "last_name {dir}, first_name {dir}",
+    'party': "party {dir}, last_name, first_name",
+    'address': "address_line_1 {dir}, last_name, first_name",
+    'city': "city {dir}, state {dir}, last_name, first_name",
+    'precinct': "precinct_name {dir}, last_name, first_name",
+    'requested': "date_requested {dir}, last_name, first_name",
+    'returned': "date_returned {dir}, last_name, first_name",
+    'status': "status {dir}, last_name, first_name",
+}
+SORT_DIRECTIONS = ('asc', 'desc')
+
+# Rows shown before "Show all"
+VOTER_LIMIT = 1000
+
+# Prepared statements kept open per pooled connection (of ~400 possible)
+PREPARED_PER_CONNECTION = 64
+
+# Optional voter filters, in the order their parameters are bound after election
+STATUS_FILTERS = (None, 'outstanding', 'status')
+PARTY_FILTERS = (None, 'party')
+CHANGE_FILTERS = (None, 'change')
+
+STATUS_DISPLAY = "CASE WHEN status IS NULL OR status = '' THEN 'Outstanding' ELSE status END"
+
+
+class ResultCache:
+    """Thread-safe LRU of query results"""
+
+    def __init__(self, size):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            rows = self._entries.get(key)
+            if rows is not None:
+                self._entries.move_to_end(key)
+            return rows
+
+    def put(self, key, rows):
+        with self._lock:
+            self._entries[key] = rows
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+
+class VoterQueries:
+    """The viewer's statements, prepared per connection, with an optional result cache"""
+
+    def __init__(self, table_name, changes_table, loads_table, cache_size=64, max_cached_rows=VOTER_LIMIT,
+                 prepared_per_connection=PREPARED_PER_CONNECTION):
+        self.table_name = table_name
+        self.changes_table = changes_table
+        self.loads_table = loads_table
+        self.results = ResultCache(cache_size)
+        self.max_cached_rows = max_cached_rows
+        self.prepared_per_connection = prepared_per_connection
+        self.statements = self._build_statements()
+        self._prepared = {}  # pooled connection -> OrderedDict of prepared cursors
+        self._prepared_lock = threading.Lock()
+
+    def _build_statements(self):
+        table = self.table_name
+        changes = self.changes_table
+        statements = {
+            'elections': """
+                SELECT SUBSTRING(PARTITION_NAME, 3) as election
+                FROM information_schema.PARTITIONS
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+                ORDER BY PARTITION_ORDINAL_POSITION
+            """,
+            'load_metadata': f"""
+                SELECT data_version, data_as_of, loaded_at, row_count, source_sha256
+                FROM {self.loads_table}
+                WHERE election = %s
+                ORDER BY data_version DESC
+                LIMIT 1
+            """,
+            'change_counts': f"""
+                SELECT load_time, change_type, COUNT(*) as count
+                FROM {changes}
+                WHERE election = %s
+                  AND load_time = (SELECT MAX(load_time) FROM {changes} WHERE election = %s)
+                GROUP BY load_time, change_type
+            """,
+            'party_counts': f"""
+                SELECT
+                    party,
+                    COUNT(*) as count
+                FROM {table}
+                WHERE election = %s
+                GROUP BY party
+                ORDER BY count DESC
+            """,
+        }
+
+        for party in PARTY_FILTERS:
+            statement_id = 'status_counts:party' if party else 'status_counts'
+            statements[statement_id] = f"""
+                SELECT {STATUS_DISPLAY} as status_display,
+                    COALESCE(status, '') as status_value,
+                    COUNT(*) as count
+                FROM {table}
+                WHERE election = %s{' AND party = %s' if party else ''}
+                GROUP BY status
+                ORDER BY count DESC
+            """
+
+        for status in STATUS_FILTERS:
+            for party in PARTY_FILTERS:
+                for change in CHANGE_FILTERS:
+                    filters = self._filter_key(status, party, change)
+                    where = self._where_clause(status, party, change)
+                    statements[f'voter_count:{filters}'] = f"SELECT COUNT(*) as total FROM {table}{where}"
+                    for sort, order_by in SORT_ORDERS.items():
+                        for direction in SORT_DIRECTIONS:
+                            for limit in ('limit', 'all'):
+                                statement_id = f'voters:{filters}:{sort}:{direction}:{limit}'
+                                statements[statement_id] = f"""
+                                    SELECT
+                                        local_id, first_name, middle_name, last_name, party,
+                                        city_or_village, precinct_name, address_line_1,
+                                        city, state, zip, date_requested, date_returned,
+                                        {STATUS_DISPLAY} as status_display
+                                    FROM {table}{where}
+                                    ORDER BY {order_by.format(dir=direction.upper())}
+                                    {f'LIMIT {VOTER_LIMIT}' if limit == 'limit' else ''}
+                                """
+
+        # Drive from the change set so only the delta rows are read
+        for party in PARTY_FILTERS:
+            statement_id = 'export:party' if party else 'export'
+            statements[statement_id] = f"""
+                SELECT
+                    c.change_type, c.old_status, c.new_status,
+                    f.local_id, f.last_name, f.first_name, f.middle_name, f.party,
+                    f.address_line_1, f.city, f.state, f.zip, f.precinct_name,
+                    f.date_requested, f.date_returned
+                FROM {changes} c
+                INNER JOIN {table} f
+                    ON f.election = c.election AND f.local_id = c.local_id
+                   AND f.date_requested <=> c.date_requested
+                WHERE c.election = %s
+                  AND c.load_time = (SELECT MAX(load_time) FROM {changes} WHERE election = %s)
+                  AND c.change_type = %s{' AND f.party = %s' if party else ''}
+                ORDER BY f.last_name, f.first_name
+            """
+        return statements
+
+    @staticmethod
+    def _filter_key(status, party, change):
+        return ','.join(f for f in (status, party, change) if f) or 'all'
+
+    def _where_clause(self, status, party, change):
+        # Election first so the query is pruned to one partition
+        clauses = ["election = %s"]
+        if status == 'outstanding':
+            clauses.append("(status IS NULL OR status = '')")
+        elif status == 'status':
+            clauses.append("status = %s")
+        if party:
+            clauses.append("party = %s")
+        if change:
+            # Semi-join against the (small) change set for the latest load, on the
+            # same (local_id, date_requested) key record_changes.sh diffs on, so a
+            # voter's other, unchanged requests aren't listed
+            table = self.table_name
+            clauses.append(
+                f"EXISTS (SELECT 1 FROM {self.changes_table} c "
+                "WHERE c.election = %s AND c.load_time = %s AND c.change_type = %s "
+                f"AND c.local_id = {table}.local_id AND c.date_requested <=> {table}.date_requested)"
+            )
+        return " WHERE " + " AND ".join(clauses)
+
+    def voter_filters(self, election, status, party, change, last_load):
+        """Return (filter key, bound parameters) for the index() filters ('ALL' means unfiltered)"""
+        params = [election]
+        status_filter = None
+        if status != 'ALL':
+            if status == '' or status == 'Outstanding':
+                status_filter = 'outstanding'
+            else:
+                status_filter = 'status'
+                params.append(status)
+
+        party_filter = None
+        if party != 'ALL':
+            party_filter = 'party'
+            params.append(party)
+
+        change_filter = None
+        if change != 'ALL':
+            change_filter = 'change'
+            params.extend([election, last_load, change])
+
+        return self._filter_key(status_filter, party_filter, change_filter), params
+
+    @staticmethod
+    def voters_statement(filters, sort, direction, show_all):
+        """Statement id for the voter list; unknown sort keys fall back to name, ascending"""
+        if sort not in SORT_ORDERS:
+            sort, direction = 'name', 'asc'
+        if direction not in SORT_DIRECTIONS:
+            direction = 'asc'
+        return f"voters:{filters}:{sort}:{direction}:{'all' if show_all else 'limit'}"
+
+    def execute(self, conn, statement_id, params, data_version=None, pooled=False):
+        """Run a statement and return its rows as dicts
+
+        On a pooled connection the statement is prepared once and reused; call
+        forget() before closing such a connection. With a data_version, results (up to max_cached_rows rows) are cached and
+        shared between requests, so callers must not modify them.
+        """
+        sql = self.statements[statement_id]
+        params = tuple(params)
+        key = (statement_id, params, data_version)
+        if data_version is not None:
+            rows = self.results.get(key)
+            if rows is not None:
+                return rows
+
+        if pooled:
+            cursor = self._prepared_cursor(conn, statement_id)
+            cursor.execute(sql, params)
+            columns = cursor.column_names
+            rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        else:
+            # One-off connection: preparing statements that are dropped with the
+            # connection would only churn the server's statement cache
+            cursor = conn.cursor()
+            try:
+                cursor.execute(sql, params)
+                columns = cursor.column_names
+                rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            finally:
+                cursor.close()
+
+        if data_version is not None and len(rows) <= self.max_cached_rows:
+            self.results.put(key, rows)
+        return rows
+
+    def _prepared_cursor(self, conn, statement_id):
+        # Only one request uses a pooled connection at a time, so its own
+        # cursors need no lock; the map of connections does
+        with self._prepared_lock:
+            cursors = self._prepared.setdefault(conn, OrderedDict())
+        cursor = cursors.get(statement_id)
+        if cursor is not None:
+            cursors.move_to_end(statement_id)
+            return cursor
+
+        while len(cursors) >= self.prepared_per_connection:
+            _, evicted = cursors.popitem(last=False)
+            evicted.close()  # deallocates the statement on the server
+        cursor = conn.cursor(prepared=True)
+        cursors[statement_id] = cursor
+        return cursor
+
+    def forget(self, conn):
+        """Drop the prepared cursors of a pooled connection that is being closed"""
+        with self._prepared_lock:
+            cursors = self._prepared.pop(conn, None)
+        for cursor in (cursors or {}).values():
+            try:
+                cursor.close()
+            except Exception:
+                pass  # the connection may already be gone; closing it frees them anyway
@@ -35,19 +35,157 @@ $db_user = getenv('DB_USER');
 $db_pass = getenv('DB_PASS');
 $db_name = getenv('DB_NAME');
 
+// Single table for all elections, LIST-partitioned by election (see manage_elections.sh)
+$table_name = getenv('TABLE_NAME') ?: 'fcabs';
+$changes_table = $table_name . '_changes';
+$loads_table = $table_name . '_loads';
+$default_election = getenv('ELECTION');
+
 // Get selected filters from dropdown
 $selected_status = isset($_GET['status']) ? $_GET['status'] : 'ALL';
 $selected_party = isset($_GET['party']) ? $_GET['party'] : 'ALL';
 $sort_column = isset($_GET['sort']) ? $_GET['sort'] : 'name';
 $sort_direction = isset($_GET['dir']) && $_GET['dir'] === 'desc' ? 'desc' : 'asc';
+$selected_change = isset($_GET['change']) ? $_GET['change'] : 'ALL';
+$selected_election = isset($_GET['election']) ? $_GET['election'] : $default_election;
 $show_all = isset($_GET['limit']) && $_GET['limit'] === 'all';
 
+// Change sets recorded per load by record_changes.sh, in dropdown order
+$change_types = [
+    'new_rejection' => 'Newly rejected',
+    'new_return' => 'Newly returned',
+    'new_request' => 'New requests',
+    'cured' => 'Cured',
+    'still_outstanding' => 'Still outstanding'
+];
+if (!isset($change_types[$selected_change])) {
+    $selected_change = 'ALL';
+}
+
 // Connect to database
 $conn = new mysqli($db_host, $db_user, $db_pass, $db_name);
 if ($conn->connect_error) {
     die("Connection failed: " . $conn->connect_error);
 }
 
+// Only elections with a partition are valid; every query below is pruned to it.
+// The partition list only changes through manage_elections.sh, so it is cached
+// in APCu for a minute when available, like the load metadata below
+$elections_cache_key = "$db_name.$table_name.elections";
+$elections = function_exists('apcu_fetch') ? apcu_fetch($elections_cache_key) : false;
+if ($elections === false) {
+    $elections = [];
+    $election_result = $conn->query("
+        SELECT SUBSTRING(PARTITION_NAME, 3) as election
+        FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = '" . $conn->real_escape_string($table_name) . "'
+        ORDER BY PARTITION_ORDINAL_POSITION
+    ");
+    while ($row = $election_result->fetch_assoc()) {
+        $elections[] = $row['election'];
+    }
+    if (function_exists('apcu_store')) {
+        apcu_store($elections_cache_key, $elections, 60);
+    }
+}
+if (!in_array($selected_election, $elections, true)) {
+    $selected_election = $default_election;
+}
+$election_sql = $conn->real_escape_string($selected_election);
+
+// "Data as of" date and data version of the most recent load (see record_load.sh),
+// cached in APCu for a minute when available
+$load_cache_key = "$db_name.$loads_table.$selected_election";
+$load = function_exists('apcu_fetch') ? apcu_fetch($load_cache_key) : false;
+if ($load === false) {
+    $load = null;
+    try {
+        $load_result = $conn->query("
+            SELECT data_version, data_as_of, loaded_at, row_count, source_sha256
+            FROM $loads_table
+            WHERE election = '$election_sql'
+            ORDER BY data_version DESC
+            LIMIT 1
+        ");
+        if ($load_result) {
+            $load = $load_result->fetch_assoc();
+        }
+    } catch (mysqli_sql_exception $e) {
+        // No load has been published yet, so the table doesn't exist
+    }
+    if (function_exists('apcu_store')) {
+        apcu_store($load_cache_key, $load, 60);
+    }
+}
+
+// Get change set counts from the most recent load
+$last_load = null;
+$changes = [];
+$change_result = $conn->query("
+    SELECT load_time, change_type, COUNT(*) as count
+    FROM $changes_table
+    WHERE election = '$election_sql'
+      AND load_time = (SELECT MAX(load_time) FROM $changes_table WHERE election = '$election_sql')
+    GROUP BY load_time, change_type
+");
+$change_counts = [];
+while ($row = $change_result->fetch_assoc()) {
+    $last_load = $row['load_time'];
+    $change_counts[$row['change_type']] = $row['count'];
+}
+if ($last_load !== null) {
+    foreach ($change_types as $value => $label) {
+        $changes[] = [
+            'value' => $value,
+            'display' => $label,
+            'count' => isset($change_counts[$value]) ? $change_counts[$value] : 0
+        ];
+    }
+}
+if ($last_load === null) {
+    $selected_change = 'ALL';
+}
+
+// Handle CSV export of one change set (reads only the delta rows)
+if (isset($_GET['export']) && $_GET['export'] === 'csv' && $selected_change !== 'ALL') {
+    $export_query = "
+        SELECT 
+            c.change_type, c.old_status, c.new_status,
+            f.local_id, f.last_name, f.first_name, f.middle_name, f.party,
+            f.address_line_1, f.city, f.state, f.zip, f.precinct_name,
+            f.date_requested, f.date_returned
+        FROM $changes_table c
+        INNER JOIN $table_name f
+            ON f.election = c.election AND f.local_id = c.local_id
+           AND f.date_requested <=> c.date_requested
+        WHERE c.election = '$election_sql'
+          AND c.load_time = '" . $conn->real_escape_string($last_load) . "'
+          AND c.change_type = '" . $conn->real_escape_string($selected_change) . "'
+    ";
+    if ($selected_party !== 'ALL') {
+        $export_query .= " AND f.party = '" . $conn->real_escape_string($selected_party) . "'";
+    }
+    $export_query .= " ORDER BY f.last_name, f.first_name";
+    
+    $export_result = $conn->query($export_query);
+    
+    header('Content-Type: text/csv');
+    header('Content-Disposition: attachment; filename=fcabs_' . $selected_election . '_' . $selected_change . '_' . date('Ymd') . '.csv');
+    
+    $out = fopen('php://output', 'w');
+    fputcsv($out, [
+        'change_type', 'old_status', 'new_status', 'local_id', 'last_name',
+        'first_name', 'middle_name', 'party', 'address_line_1', 'city', 'state',
+        'zip', 'precinct_name', 'date_requested', 'date_returned'
+    ]);
+    while ($row = $export_result->fetch_row()) {
+        fputcsv($out, $row);
+    }
+    fclose($out);
+    $conn->close();
+    exit;
+}
+
 // Get status counts for dropdown (all voters)
 $status_query = "
     SELECT 
@@ -57,7 +195,8 @@ $status_query = "
         END as status_display,
         COALESCE(status, '') as status_value,
         COUNT(*) as count 
-    FROM fcabs2025 
+    FROM $table_name 
+    WHERE election = '$election_sql'
     GROUP BY status 
     ORDER BY count DESC
 ";
@@ -78,10 +217,11 @@ $chart_query = "
         END as status_display,
         COALESCE(status, '') as status_value,
         COUNT(*) as count 
-    FROM fcabs2025
+    FROM $table_name
+    WHERE election = '$election_sql'
 ";
 if ($selected_party !== 'ALL') {
-    $chart_query .= " WHERE party = '" . $conn->real_escape_string($selected_party) . "'";
+    $chart_query .= " AND party = '" . $conn->real_escape_string($selected_party) . "'";
 }
 $chart_query .= " GROUP BY status ORDER BY count DESC";
 
@@ -96,7 +236,8 @@ $party_query = "
     SELECT 
         party,
         COUNT(*) as count 
-    FROM fcabs2025 
+    FROM $table_name 
+    WHERE election = '$election_sql'
     GROUP BY party 
     ORDER BY count DESC
 ";
@@ -127,11 +268,11 @@ $voter_query = "
             ELSE status 
         END as status_display,
         ballot_style
-    FROM fcabs2025
+    FROM $table_name
 ";
 
-// Add WHERE clause based on selections
-$where_clauses = [];
+// Add WHERE clause based on selections (election first so the query is pruned to one partition)
+$where_clauses = ["election = '$election_sql'"];
 
 if ($selected_status !== 'ALL') {
     if ($selected_status === 'Outstanding') {
@@ -145,10 +286,18 @@ if ($selected_party !== 'ALL') {
     $where_clauses[] = "party = '" . $conn->real_escape_string($selected_party) . "'";
 }
 
-if (count($where_clauses) > 0) {
-    $voter_query .= " WHERE " . implode(' AND ', $where_clauses);
+if ($selected_change !== 'ALL') {
+    // Semi-join against the (small) change set for the latest load, on the same
+    // (local_id, date_requested) key record_changes.sh diffs on
+    $where_clauses[] = "EXISTS (SELECT 1 FROM $changes_table c WHERE c.election = '$election_sql' AND c.load_time = '"
+        . $conn->real_escape_string($last_load) . "' AND c.change_type = '"
+        . $conn->real_escape_string($selected_change) . "'"
+        . " AND c.local_id = $table_name.local_id AND c.date_requested <=> $table_name.date_requested)";
 }
 
+$where_clause = " WHERE " . implode(' AND ', $where_clauses);
+$voter_query .= $where_clause;
+
 // Add ORDER BY clause based on sort parameters
 $order_by = "";
 switch($sort_column) {
@@ -188,7 +337,7 @@ if ($sort_column === 'name') {
 }
 
 // Get total count before applying limit
-$count_query = "SELECT COUNT(*) as total FROM fcabs2025" . $where_clause;
+$count_query = "SELECT COUNT(*) as total FROM $table_name" . $where_clause;
 $count_result = $conn->query($count_query);
 $total_count_filtered = $count_result->fetch_assoc()['total'];
 
@@ -213,6 +362,8 @@ if (!$show_all && $display_count >= 1000) {
     $params = [];
     if ($selected_status !== 'ALL') $params['status'] = $selected_status;
     if ($selected_party !== 'ALL') $params['party'] = $selected_party;
+    if ($selected_change !== 'ALL') $params['change'] = $selected_change;
+    if ($selected_election !== $default_election) $params['election'] = $selected_election;
     if ($sort_column !== 'name') $params['sort'] = $sort_column;
     if ($sort_direction !== 'asc') $params['dir'] = $sort_direction;
     $params['limit'] = 'all';
@@ -269,6 +420,8 @@ if (isset($_GET['ajax']) && $_GET['ajax'] == '1') {
         $params = [];
         if ($selected_status !== 'ALL') $params['status'] = $selected_status;
         if ($selected_party !== 'ALL') $params['party'] = $selected_party;
+        if ($selected_change !== 'ALL') $params['change'] = $selected_change;
+        if ($selected_election !== $default_election) $params['election'] = $selected_election;
         $params['sort'] = $col;
         
         if ($sort_column === $col) {
@@ -536,12 +689,26 @@ if (isset($_GET['ajax']) && $_GET['ajax'] == '1') {
                 <h1>🗳️ Franklin County Absentee Voters</h1>
                 <p>Mail-in ballot tracking and status viewer</p>
                 <p style="margin-top: 10px; font-size: 13px; opacity: 0.85;">
-                    📅 Data as of: <strong>November 6, 2025</strong>
+                    📅 Data as of: <strong><?php echo $load ? date('F j, Y', strtotime($load['data_as_of'])) : 'not yet loaded'; ?></strong>
                 </p>
             </div>
         </div>
         
         <div class="controls">
+            <?php if (count($elections) > 1): ?>
+            <div class="filter-group">
+                <label for="election-filter">Election:</label>
+                <select id="election-filter" name="election" onchange="applyFilters()">
+                    <?php foreach (array_reverse($elections) as $election): ?>
+                        <option value="<?php echo htmlspecialchars($election); ?>" 
+                                <?php echo $selected_election === $election ? 'selected' : ''; ?>>
+                            <?php echo htmlspecialchars($election); ?>
+                        </option>
+                    <?php endforeach; ?>
+                </select>
+            </div>
+            <?php endif; ?>
+            
             <div class="filter-group">
                 <label for="status-filter">Filter by Status:</label>
                 <select id="status-filter" name="status" onchange="applyFilters()">
@@ -575,6 +742,32 @@ if (isset($_GET['ajax']) && $_GET['ajax'] == '1') {
                     <?php endforeach; ?>
                 </select>
             </div>
+            
+            <?php if ($last_load !== null): ?>
+            <div class="filter-group">
+                <label for="change-filter">Changes since last load:</label>
+                <select id="change-filter" name="change" onchange="applyFilters()">
+                    <option value="ALL" <?php echo $selected_change === 'ALL' ? 'selected' : ''; ?>>
+                        All voters
+                    </option>
+                    <?php foreach ($changes as $change): ?>
+                        <option value="<?php echo htmlspecialchars($change['value']); ?>" 
+                                <?php echo $selected_change === $change['value'] ? 'selected' : ''; ?>>
+                            <?php echo htmlspecialchars($change['display']); ?> 
+                            (<?php echo number_format($change['count']); ?>)
+                        </option>
+                    <?php endforeach; ?>
+                </select>
+                <?php if ($selected_change !== 'ALL'): ?>
+                    <?php
+                    $export_params = ['export' => 'csv', 'change' => $selected_change];
+                    if ($selected_party !== 'ALL') $export_params['party'] = $selected_party;
+                    if ($selected_election !== $default_election) $export_params['election'] = $selected_election;
+                    ?>
+                    <a href="?<?php echo htmlspecialchars(http_build_query($export_params)); ?>" style="font-size: 13px; color: #667eea;">Export CSV</a>
+                <?php endif; ?>
+            </div>
+            <?php endif; ?>
         </div>
         
         <div class="chart-section">
@@ -616,6 +809,8 @@ if (isset($_GET['ajax']) && $_GET['ajax'] == '1') {
                                 $params = [];
                                 if ($selected_status !== 'ALL') $params['status'] = $selected_status;
                                 if ($selected_party !== 'ALL') $params['party'] = $selected_party;
+                                if ($selected_change !== 'ALL') $params['change'] = $selected_change;
+                                if ($selected_election !== $default_election) $params['election'] = $selected_election;
                                 $params['sort'] = $col;
                                 
                                 // Toggle direction
@@ -688,10 +883,16 @@ if (isset($_GET['ajax']) && $_GET['ajax'] == '1') {
         function applyFilters() {
             const status = document.getElementById('status-filter').value;
             const party = document.getElementById('party-filter').value;
+            const changeFilter = document.getElementById('change-filter');
+            const change = changeFilter ? changeFilter.value : 'ALL';
+            const electionFilter = document.getElementById('election-filter');
+            const defaultElection = <?php echo json_encode($default_election); ?>;
             
             const params = new URLSearchParams();
+            if (electionFilter && electionFilter.value !== defaultElection) params.append('election', electionFilter.value);
             if (status !== 'ALL') params.append('status', status);
             if (party !== 'ALL') params.append('party', party);
+            if (change !== 'ALL') params.append('change', change);
             
             window.location.href = '?' + params.toString();
         }
@@ -3,13 +3,19 @@
 Franklin County Absentee Ballot Voter Viewer - Flask Web Application
 """
 
-from flask import Flask, render_template_string, request, jsonify
+from flask import Flask, render_template_string, request, jsonify, Response
 import mysql.connector
 from datetime import datetime
 from urllib.parse import urlencode
+import csv
+import io
 import os
+import threading
+import time
 from pathlib import Path
 
+from voter_queries import VoterQueries, SORT_ORDERS, SORT_DIRECTIONS
+
 app = Flask(__name__)
 
 # Load environment variables from .env file
@@ -49,6 +55,35 @@ DB_CONFIG = {
     'database': os.getenv('DB_NAME')
 }
 
+# Single table for all elections, LIST-partitioned by election (see manage_elections.sh)
+TABLE_NAME = os.getenv('TABLE_NAME', 'fcabs')
+CHANGES_TABLE = f'{TABLE_NAME}_changes'
+LOADS_TABLE = f'{TABLE_NAME}_loads'
+DEFAULT_ELECTION = os.getenv('ELECTION')
+
+# Change sets recorded per load by record_changes.sh, in dropdown order
+CHANGE_TYPES = [
+    ('new_rejection', 'Newly rejected'),
+    ('new_return', 'Newly returned'),
+    ('new_request', 'New requests'),
+    ('cured', 'Cured'),
+    ('still_outstanding', 'Still outstanding'),
+]
+CHANGE_LABELS = dict(CHANGE_TYPES)
+
+# Latest load metadata per election (see record_load.sh), re-read at most this often
+LOAD_METADATA_TTL = 60
+_load_metadata_cache = {}
+
+# Partition list (only changes through manage_elections.sh), cached with the same TTL
+_elections_cache = None
+
+# Fixed set of prepared statements, plus a result cache keyed on data_version
+queries = VoterQueries(TABLE_NAME, CHANGES_TABLE, LOADS_TABLE)
+
+# Pooled connections keep their prepared statements between requests
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))
+
 HTML_TEMPLATE = '''
 <!DOCTYPE html>
 <html lang="en">
@@ -253,12 +288,25 @@ HTML_TEMPLATE = '''
                 <h1>🗳️ Franklin County Absentee Voters</h1>
                 <p>Mail-in ballot tracking and status viewer</p>
                 <p style="margin-top: 10px; font-size: 13px; opacity: 0.85;">
-                    📅 Data as of: <strong>November 6, 2025</strong>
+                    📅 Data as of: <strong>{{ load.data_as_of.strftime('%B %-d, %Y') if load else 'not yet loaded' }}</strong>
                 </p>
             </div>
         </div>
         
         <div class="controls">
+            {% if elections|length > 1 %}
+            <div class="filter-group">
+                <label for="election-filter">Election:</label>
+                <select id="election-filter" onchange="applyFilters()">
+                    {% for election in elections|reverse %}
+                    <option value="{{ election }}" {{ 'selected' if selected_election == election else '' }}>
+                        {{ election }}
+                    </option>
+                    {% endfor %}
+                </select>
+            </div>
+            {% endif %}
+            
             <div class="filter-group">
                 <label for="status-filter">Filter by Status:</label>
                 <select id="status-filter" onchange="applyFilters()">
@@ -286,6 +334,25 @@ HTML_TEMPLATE = '''
                     {% endfor %}
                 </select>
             </div>
+            
+            {% if last_load %}
+            <div class="filter-group">
+                <label for="change-filter">Changes since last load:</label>
+                <select id="change-filter" onchange="applyFilters()">
+                    <option value="ALL" {{ 'selected' if selected_change == 'ALL' else '' }}>
+                        All voters
+                    </option>
+                    {% for change in changes %}
+                    <option value="{{ change.value }}" {{ 'selected' if selected_change == change.value else '' }}>
+                        {{ change.display }} ({{ '{:,}'.format(change.count) }})
+                    </option>
+                    {% endfor %}
+                </select>
+                {% if selected_change != 'ALL' %}
+                <a href="export?{{ export_query }}" style="font-size: 13px; color: #667eea;">Export CSV</a>
+                {% endif %}
+            </div>
+            {% endif %}
         </div>
         
         <div class="chart-section">
@@ -324,6 +391,8 @@ HTML_TEMPLATE = '''
                             {% set params = {} %}
                             {% if selected_status != 'ALL' %}{% set _ = params.update({'status': selected_status}) %}{% endif %}
                             {% if selected_party != 'ALL' %}{% set _ = params.update({'party': selected_party}) %}{% endif %}
+                            {% if selected_change != 'ALL' %}{% set _ = params.update({'change': selected_change}) %}{% endif %}
+                            {% if selected_election != default_election %}{% set _ = params.update({'election': selected_election}) %}{% endif %}
                             {% set _ = params.update({'sort': col}) %}
                             {% if sort_column == col %}
                                 {% set _ = params.update({'dir': 'desc' if sort_direction == 'asc' else 'asc'}) %}
@@ -371,10 +440,15 @@ HTML_TEMPLATE = '''
         function applyFilters() {
             const status = document.getElementById('status-filter').value;
             const party = document.getElementById('party-filter').value;
+            const changeFilter = document.getElementById('change-filter');
+            const change = changeFilter ? changeFilter.value : 'ALL';
+            const electionFilter = document.getElementById('election-filter');
             
             const params = new URLSearchParams();
+            if (electionFilter && electionFilter.value !== '{{ default_election }}') params.append('election', electionFilter.value);
             if (status !== 'ALL') params.append('status', status);
             if (party !== 'ALL') params.append('party', party);
+            if (change !== 'ALL') params.append('change', change);
             
             window.location.href = '?' + params.toString();
         }
@@ -517,9 +591,92 @@ HTML_TEMPLATE = '''
 </html>
 '''
 
-def get_db_connection():
-    """Create and return a database connection"""
-    return mysql.connector.connect(**DB_CONFIG)
+class ConnectionPool:
+    """Up to size raw connections, reused across requests so they keep their prepared statements
+
+    get() returns (conn, pooled); when every pooled connection is busy the request
+    gets a one-off connection instead. Hand both back with put().
+    """
+
+    def __init__(self, size, config):
+        self.size = size
+        self.config = config
+        self._idle = []
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+            pooled = conn is not None or self._opened < self.size
+            if conn is None and pooled:
+                self._opened += 1
+        
+        if conn is not None and not conn.is_connected():
+            # Dropped by the server (e.g. wait_timeout), along with its prepared statements
+            queries.forget(conn)
+            conn.close()
+            conn = None
+        if conn is None:
+            try:
+                conn = mysql.connector.connect(**self.config)
+            except Exception:
+                if pooled:
+                    with self._lock:
+                        self._opened -= 1
+                raise
+        return conn, pooled
+
+    def put(self, conn, pooled):
+        if pooled:
+            with self._lock:
+                self._idle.append(conn)
+        else:
+            conn.close()
+
+db_pool = ConnectionPool(DB_POOL_SIZE, DB_CONFIG)
+
+def get_elections(conn, pooled):
+    """Return the elections that have a partition, oldest first, cached for LOAD_METADATA_TTL seconds"""
+    global _elections_cache
+    now = time.monotonic()
+    cached = _elections_cache
+    if cached and now - cached[0] < LOAD_METADATA_TTL:
+        return cached[1]
+    
+    rows = queries.execute(conn, 'elections', (TABLE_NAME,), pooled=pooled)
+    elections = [row['election'] for row in rows]
+    _elections_cache = (now, elections)
+    return elections
+
+def get_load_metadata(conn, pooled, election):
+    """Return the election's latest load metadata row (or None), cached for LOAD_METADATA_TTL seconds"""
+    now = time.monotonic()
+    cached = _load_metadata_cache.get(election)
+    if cached and now - cached[0] < LOAD_METADATA_TTL:
+        return cached[1]
+    
+    try:
+        rows = queries.execute(conn, 'load_metadata', (election,), pooled=pooled)
+        load = rows[0] if rows else None
+    except mysql.connector.ProgrammingError:
+        # No load has been published yet, so the table doesn't exist
+        load = None
+    
+    _load_metadata_cache[election] = (now, load)
+    return load
+
+def get_change_counts(conn, pooled, election, data_version):
+    """Return (last_load, counts) for the change sets of the election's most recent load"""
+    rows = queries.execute(conn, 'change_counts', (election, election), data_version, pooled=pooled)
+    
+    if not rows:
+        return None, []
+    
+    counts = {row['change_type']: row['count'] for row in rows}
+    changes = [{'value': value, 'display': label, 'count': counts.get(value, 0)}
+               for value, label in CHANGE_TYPES]
+    return rows[0]['load_time'], changes
 
 @app.route('/')
 def index():
@@ -527,142 +684,71 @@ def index():
     selected_party = request.args.get('party', 'ALL')
     sort_column = request.args.get('sort', 'name')
     sort_direction = request.args.get('dir', 'asc')
+    selected_change = request.args.get('change', 'ALL')
+    selected_election = request.args.get('election', DEFAULT_ELECTION)
     show_all = request.args.get('limit') == 'all'
     
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
-    # Get status counts for dropdown (all voters)
-    cursor.execute("""
-        SELECT 
-            CASE 
-                WHEN status IS NULL OR status = '' THEN 'Outstanding'
-                ELSE status 
-            END as status_display,
-            COALESCE(status, '') as status_value,
-            COUNT(*) as count 
-        FROM fcabs2025 
-        GROUP BY status 
-        ORDER BY count DESC
-    """)
-    statuses = [{'display': row['status_display'], 
-                 'value': row['status_value'], 
-                 'count': row['count']} 
-                for row in cursor.fetchall()]
-    total_count = sum(s['count'] for s in statuses)
-    
-    # Get status counts for pie chart (filtered by party if selected)
-    if selected_party != 'ALL':
-        cursor.execute(f"""
-            SELECT 
-                CASE 
-                    WHEN status IS NULL OR status = '' THEN 'Outstanding'
-                    ELSE status 
-                END as status_display,
-                COALESCE(status, '') as status_value,
-                COUNT(*) as count 
-            FROM fcabs2025 
-            WHERE party = '{selected_party}'
-            GROUP BY status 
-            ORDER BY count DESC
-        """)
-    else:
-        cursor.execute("""
-            SELECT 
-                CASE 
-                    WHEN status IS NULL OR status = '' THEN 'Outstanding'
-                    ELSE status 
-                END as status_display,
-                COALESCE(status, '') as status_value,
-                COUNT(*) as count 
-            FROM fcabs2025 
-            GROUP BY status 
-            ORDER BY count DESC
-        """)
-    chart_statuses = [{'display': row['status_display'], 
-                       'value': row['status_value'], 
-                       'count': row['count']} 
-                      for row in cursor.fetchall()]
-    
-    # Get party counts
-    cursor.execute("""
-        SELECT 
-            party,
-            COUNT(*) as count 
-        FROM fcabs2025 
-        GROUP BY party 
-        ORDER BY count DESC
-    """)
-    parties = [{'party': row['party'], 
-                'count': row['count']} 
-               for row in cursor.fetchall()]
+    if selected_change not in CHANGE_LABELS:
+        selected_change = 'ALL'
+    if sort_column not in SORT_ORDERS:
+        sort_column = 'name'
+    if sort_direction not in SORT_DIRECTIONS:
+        sort_direction = 'asc'
     
-    # Build voter query
-    voter_query = """
-        SELECT 
-            local_id, first_name, middle_name, last_name, party,
-            city_or_village, precinct_name, address_line_1,
-            city, state, zip, date_requested, date_returned,
-            CASE 
-                WHEN status IS NULL OR status = '' THEN 'Outstanding'
-                ELSE status 
-            END as status_display
-        FROM fcabs2025
-    """
-    
-    # Add WHERE clause
-    where_clauses = []
-    
-    if selected_status != 'ALL':
-        if selected_status == '' or selected_status == 'Outstanding':
-            where_clauses.append("(status IS NULL OR status = '')")
+    conn, pooled = db_pool.get()
+    try:
+        # Only elections with a partition are valid; every query below is pruned to it
+        elections = get_elections(conn, pooled)
+        if selected_election not in elections:
+            selected_election = DEFAULT_ELECTION
+        
+        # "Data as of" date and data version of the most recent load; results are
+        # cached per data version, so a new load is picked up without serving stale rows
+        load = get_load_metadata(conn, pooled, selected_election)
+        data_version = load['data_version'] if load else None
+        
+        # Get change set counts from the most recent load
+        last_load, changes = get_change_counts(conn, pooled, selected_election, data_version)
+        if last_load is None:
+            selected_change = 'ALL'
+        
+        # Get status counts for dropdown (all voters)
+        rows = queries.execute(conn, 'status_counts', (selected_election,), data_version, pooled=pooled)
+        statuses = [{'display': row['status_display'], 
+                     'value': row['status_value'], 
+                     'count': row['count']} 
+                    for row in rows]
+        total_count = sum(s['count'] for s in statuses)
+        
+        # Get status counts for pie chart (filtered by party if selected)
+        if selected_party != 'ALL':
+            rows = queries.execute(conn, 'status_counts:party', (selected_election, selected_party), data_version, pooled=pooled)
         else:
-            where_clauses.append(f"status = '{selected_status}'")
-    
-    if selected_party != 'ALL':
-        where_clauses.append(f"party = '{selected_party}'")
-    
-    if where_clauses:
-        voter_query += " WHERE " + " AND ".join(where_clauses)
-    
-    # Add ORDER BY clause based on sort parameters with secondary sort by name
-    direction = 'DESC' if sort_direction == 'desc' else 'ASC'
-    
-    if sort_column == 'name':
-        order_by = f"last_name {direction}, first_name {direction}"
-    elif sort_column == 'party':
-        order_by = f"party {direction}, last_name, first_name"
-    elif sort_column == 'address':
-        order_by = f"address_line_1 {direction}, last_name, first_name"
-    elif sort_column == 'city':
-        order_by = f"city {direction}, state {direction}, last_name, first_name"
-    elif sort_column == 'precinct':
-        order_by = f"precinct_name {direction}, last_name, first_name"
-    elif sort_column == 'requested':
-        order_by = f"date_requested {direction}, last_name, first_name"
-    elif sort_column == 'returned':
-        order_by = f"date_returned {direction}, last_name, first_name"
-    elif sort_column == 'status':
-        order_by = f"status {direction}, last_name, first_name"
-    else:
-        order_by = "last_name, first_name"
-    
-    voter_query += f" ORDER BY {order_by}"
-    
-    # Get total count before applying limit
-    count_query = f"SELECT COUNT(*) as total FROM fcabs2025{where_clause}"
-    cursor.execute(count_query)
-    total_count_filtered = cursor.fetchone()['total']
-    
-    # Add LIMIT unless showing all
-    if not show_all:
-        voter_query += " LIMIT 1000"
-    
-    cursor.execute(voter_query)
-    voters = cursor.fetchall()
-    
-    cursor.close()
-    conn.close()
+            rows = queries.execute(conn, 'status_counts', (selected_election,), data_version, pooled=pooled)
+        chart_statuses = [{'display': row['status_display'], 
+                           'value': row['status_value'], 
+                           'count': row['count']} 
+                          for row in rows]
+        
+        # Get party counts
+        rows = queries.execute(conn, 'party_counts', (selected_election,), data_version, pooled=pooled)
+        parties = [{'party': row['party'], 
+                    'count': row['count']} 
+                   for row in rows]
+        
+        # Whitelisted filters and sort pick the statement; filter values are bound parameters
+        filters, where_params = queries.voter_filters(
+            selected_election, selected_status, selected_party, selected_change, last_load
+        )
+        
+        # Get total count before applying limit
+        rows = queries.execute(conn, f'voter_count:{filters}', where_params, data_version, pooled=pooled)
+        total_count_filtered = rows[0]['total']
+        
+        voter_statement = queries.voters_statement(filters, sort_column, sort_direction, show_all)
+        voters = queries.execute(conn, voter_statement, where_params, data_version, pooled=pooled)
+    finally:
+        db_pool.put(conn, pooled)
     
     # Handle AJAX requests
     if request.args.get('ajax') == '1':
@@ -710,6 +796,10 @@ def index():
                 params['status'] = selected_status
             if selected_party != 'ALL':
                 params['party'] = selected_party
+            if selected_change != 'ALL':
+                params['change'] = selected_change
+            if selected_election != DEFAULT_ELECTION:
+                params['election'] = selected_election
             params['sort'] = col
             
             if sort_column == col:
@@ -737,6 +827,10 @@ def index():
                 params['status'] = selected_status
             if selected_party != 'ALL':
                 params['party'] = selected_party
+            if selected_change != 'ALL':
+                params['change'] = selected_change
+            if selected_election != DEFAULT_ELECTION:
+                params['election'] = selected_election
             if sort_column != 'name':
                 params['sort'] = sort_column
             if sort_direction != 'asc':
@@ -765,6 +859,10 @@ def index():
             params['status'] = selected_status
         if selected_party != 'ALL':
             params['party'] = selected_party
+        if selected_change != 'ALL':
+            params['change'] = selected_change
+        if selected_election != DEFAULT_ELECTION:
+            params['election'] = selected_election
         if sort_column != 'name':
             params['sort'] = sort_column
         if sort_direction != 'asc':
@@ -773,6 +871,14 @@ def index():
         show_all_url = '?' + urlencode(params)
         show_all_button_main = f' <button onclick="window.location.href=\'{show_all_url}\'" style="padding:5px 12px; background:#667eea; color:white; border:none; border-radius:4px; cursor:pointer; font-size:13px; margin-left:10px;">Show all</button>'
     
+    # Export link for the selected change set
+    export_params = {'change': selected_change}
+    if selected_party != 'ALL':
+        export_params['party'] = selected_party
+    if selected_election != DEFAULT_ELECTION:
+        export_params['election'] = selected_election
+    export_query = urlencode(export_params)
+    
     return render_template_string(
         HTML_TEMPLATE,
         voters=voters,
@@ -782,6 +888,14 @@ def index():
         total_count=total_count,
         selected_status=selected_status,
         selected_party=selected_party,
+        selected_change=selected_change,
+        selected_election=selected_election,
+        default_election=DEFAULT_ELECTION,
+        elections=elections,
+        changes=changes,
+        last_load=last_load,
+        load=load,
+        export_query=export_query,
         sort_column=sort_column,
         sort_direction=sort_direction,
         showing_limit=showing_limit_main,
@@ -789,6 +903,48 @@ def index():
         display_count=display_count_main
     )
 
+@app.route('/export')
+def export():
+    """Download one change set from the most recent load as CSV"""
+    selected_change = request.args.get('change', '')
+    selected_party = request.args.get('party', 'ALL')
+    selected_election = request.args.get('election', DEFAULT_ELECTION)
+    
+    if selected_change not in CHANGE_LABELS:
+        return jsonify({'error': 'Unknown change set'}), 400
+    
+    conn, pooled = db_pool.get()
+    try:
+        if selected_election not in get_elections(conn, pooled):
+            selected_election = DEFAULT_ELECTION
+        
+        params = [selected_election, selected_election, selected_change]
+        if selected_party != 'ALL':
+            params.append(selected_party)
+            rows = queries.execute(conn, 'export:party', params, pooled=pooled)
+        else:
+            rows = queries.execute(conn, 'export', params, pooled=pooled)
+    finally:
+        db_pool.put(conn, pooled)
+    
+    output = io.StringIO()
+    writer = csv.writer(output)
+    columns = [
+        'change_type', 'old_status', 'new_status', 'local_id', 'last_name',
+        'first_name', 'middle_name', 'party', 'address_line_1', 'city', 'state',
+        'zip', 'precinct_name', 'date_requested', 'date_returned'
+    ]
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow([row[col] if row[col] is not None else '' for col in columns])
+    
+    filename = f"fcabs_{selected_election}_{selected_change}_{datetime.now().strftime('%Y%m%d')}.csv"
+    return Response(
+        output.getvalue(),
+        mimetype='text/csv',
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
 if __name__ == '__main__':
     print("Starting Franklin County Voter Viewer...")
     print("Access the application at: http://localhost:5000")